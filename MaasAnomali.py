@@ -1,7 +1,10 @@
 import sys
 import os
 import multiprocessing
+import threading
+import time
 import traceback
+import webbrowser
 
 # Version Info
 VERSION = "0.2.3"
@@ -39,8 +42,12 @@ if getattr(sys, 'frozen', False):
             sys.path.insert(0, sys._MEIPASS)
 
 try:
+    # Başlangıç süreleri buradan itibaren ölçülür
+    from src.app.core.metrics import metrics
     from src.app.main import app
+    from src.app.services import worker_pool
     import uvicorn
+    metrics.mark_startup("imports")
 except Exception as e:
     log_error(f"Modüller yüklenirken bir sorun oluştu: {e}")
     sys.exit(1)
@@ -69,13 +76,37 @@ LOGGING_CONFIG = {
     },
 }
 
+HOST = "127.0.0.1"
+PORT = 8000
+
+def announce_when_ready(server):
+    """Sunucu dinlemeye başlayınca süreleri yazar ve (paket sürümünde) tarayıcıyı açar"""
+    while not server.started:
+        if server.should_exit:
+            return
+        time.sleep(0.02)
+    metrics.mark_startup("listening")
+    # PDF modülleri ve işçiler arka planda ısınır; ilk istekler bunu beklemez
+    worker_pool.start_prewarm()
+    timings = ", ".join(f"{stage}: {seconds:.2f} sn" for stage, seconds in metrics.startup.items())
+    print(f"Başlangıç süreleri - {timings}")
+
+    if getattr(sys, 'frozen', False) and not os.getenv("DEBUG"):
+        url = f"http://{HOST}:{PORT}"
+        print(f"Uygulama başlatıldı! Tarayıcı açılıyor: {url}")
+        print("Not: Tarayıcı otomatik açılmazsa yukarıdaki adresi kopyalayıp tarayıcınıza yapıştırın.")
+        webbrowser.open(url)
+
 if __name__ == "__main__":
     # Required for PyInstaller + multiprocessing
     multiprocessing.freeze_support()
     
     try:
         # Run uvicorn with safe logging config
-        uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info", log_config=LOGGING_CONFIG)
+        config = uvicorn.Config(app, host=HOST, port=PORT, log_level="info", log_config=LOGGING_CONFIG)
+        server = uvicorn.Server(config)
+        threading.Thread(target=announce_when_ready, args=(server,), daemon=True).start()
+        server.run()
     except Exception as e:
         log_error(f"Sunucu başlatılamadı: {e}")
         sys.exit(1)
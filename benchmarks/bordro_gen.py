@@ -0,0 +1,221 @@
+"""Sentetik bordro PDF üreticisi (harici bağımlılık yok).
+
+Tablo düzeni process_page_chunk'ın beklediği 17 sütunla aynıdır:
+Sıra, Adı Soyadı, ..., M.Saat (6), Maaş (7), Mesai (8), Ek, Yardım, BES, Avans, İcra, Borç, Banka, Kasa (16).
+Her sayfanın üstünde "<yıl> <ay> Dönemi" başlığı bulunur.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+import os
+import random
+import zlib
+
+MONTHS = ["Ocak", "Şubat", "Mart", "Nisan", "Mayıs", "Haziran",
+          "Temmuz", "Ağustos", "Eylül", "Ekim", "Kasım", "Aralık"]
+
+# Helvetica WinAnsi kodlamasında olmayan Türkçe harfler /Differences ile boş kodlara yerleştirilir
+TURKISH_CODES = {"ş": 128, "Ş": 129, "ğ": 130, "Ğ": 131, "ı": 132, "İ": 133}
+DIFFERENCES = b"[128 /scedilla /Scedilla /gbreve /Gbreve /dotlessi /Idotaccent]"
+
+COLUMN_WIDTHS = [22, 90, 50, 50, 22, 22, 30, 48, 44, 40, 40, 38, 38, 38, 38, 48, 40]
+HEADER = ["Sıra", "Adı Soyadı", "TC", "Görev", "Gün", "", "M.Saat", "Maaş", "Mesai",
+          "Ek", "Yardım", "BES", "Avans", "İcra", "Borç", "Banka", "Kasa"]
+
+PAGE_WIDTH = 842
+MARGIN = 20
+TITLE_HEIGHT = 35
+
+# Yerleştirilen anomali oranları (her biri ayrı çalışan grubuna)
+BALANCE_RATE = 0.03
+OVERTIME_RATE = 0.03
+RAISE_RATE = 0.03
+
+@dataclass
+class Employee:
+    name: str
+    maas: float
+    mesai: float
+    mesai_saati: float
+    yardim: float
+
+@dataclass
+class GeneratedMonth:
+    path: str
+    year: int
+    month: int
+    pages: int
+    employees: int
+    # (personel_ad, kural) çiftleri: "balance", "increase", "overtime"
+    planted: Set[Tuple[str, str]] = field(default_factory=set)
+
+def _encode(text: str) -> bytes:
+    out = bytearray()
+    for ch in text:
+        if ch in TURKISH_CODES:
+            out.append(TURKISH_CODES[ch])
+        else:
+            out += ch.encode("cp1252")
+    return bytes(out).replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+def money(value: float) -> str:
+    """1234.5 -> '1.234,50' (bordrodaki biçim)"""
+    text = f"{value:,.2f}"
+    return text.replace(",", "X").replace(".", ",").replace("X", ".")
+
+def _row_height(rows_per_page: int) -> float:
+    return 16.0 if rows_per_page <= 30 else 12.0
+
+def _page_content(title: str, rows: List[List[str]], page_height: float, row_height: float) -> bytes:
+    ops = [b"0.5 w", b"BT /F1 10 Tf %d %.1f Td (" % (MARGIN + 10, page_height - 25) + _encode(title) + b") Tj ET"]
+    xs = [MARGIN]
+    for width in COLUMN_WIDTHS:
+        xs.append(xs[-1] + width)
+
+    top = page_height - TITLE_HEIGHT
+    for r, row in enumerate(rows):
+        y = top - r * row_height
+        for c, cell in enumerate(row):
+            if cell:
+                ops.append(b"BT /F1 6 Tf %.1f %.1f Td (" % (xs[c] + 2, y - row_height + 5) + _encode(cell) + b") Tj ET")
+
+    bottom = top - len(rows) * row_height
+    for r in range(len(rows) + 1):
+        y = top - r * row_height
+        ops.append(b"%.1f %.1f m %.1f %.1f l S" % (xs[0], y, xs[-1], y))
+    for x in xs:
+        ops.append(b"%.1f %.1f m %.1f %.1f l S" % (x, top, x, bottom))
+    return b"\n".join(ops)
+
+def write_pdf(path: str, contents: List[bytes], page_height: float):
+    """Sayfa içerik akışlarından en küçük geçerli PDF'i yazar"""
+    objects: List[Optional[bytes]] = []
+
+    def add(obj: Optional[bytes]) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding"
+               b" << /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences " + DIFFERENCES + b" >> >>")
+    pages_id = add(None)
+    kids = []
+    for content in contents:
+        data = zlib.compress(content)
+        stream = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 %d 0 R >> >>"
+            b" /Contents %d 0 R >>" % (pages_id, PAGE_WIDTH, page_height, font, stream)
+        ))
+    objects[pages_id - 1] = (b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids)
+                             + b"] /Count %d >>" % len(kids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+def make_staff(employees: int, seed: int = 0) -> List[Employee]:
+    """Dengeli, sınır içinde mesaili temel kadro"""
+    rnd = random.Random(seed)
+    return [
+        Employee(
+            name=f"PERSONEL {i:06d} ŞAHİN",
+            maas=round(rnd.uniform(17000, 40000), 2),
+            mesai=round(rnd.uniform(0, 4000), 2),
+            mesai_saati=round(rnd.uniform(0, 45), 1),
+            yardim=round(rnd.uniform(0, 500), 2),
+        )
+        for i in range(employees)
+    ]
+
+def next_month(staff: List[Employee], seed: int = 1) -> Tuple[List[Employee], Dict[str, str]]:
+    """Küçük dalgalanmalarla bir sonraki ay; bazı çalışanlara %50 zam yerleştirilir"""
+    rnd = random.Random(seed)
+    result = []
+    planted: Dict[str, str] = {}
+    for emp in staff:
+        maas = emp.maas * rnd.uniform(0.98, 1.05)
+        if rnd.random() < RAISE_RATE:
+            maas = emp.maas * 1.5
+            planted[emp.name] = "increase"
+        result.append(Employee(
+            name=emp.name,
+            maas=round(maas, 2),
+            mesai=round(emp.mesai * rnd.uniform(0.95, 1.05), 2),
+            mesai_saati=emp.mesai_saati,
+            yardim=emp.yardim,
+        ))
+    return result, planted
+
+def generate_month(
+    path: str,
+    staff: List[Employee],
+    year: int,
+    month: int,
+    rows_per_page: int = 30,
+    plant: bool = True,
+    seed: int = 0,
+) -> GeneratedMonth:
+    """Kadroyu bir dönem bordrosu olarak yazar; plant=True ise denge ve mesai anomalileri eklenir"""
+    rnd = random.Random(seed)
+    planted: Set[Tuple[str, str]] = set()
+    rows = []
+    for i, emp in enumerate(staff):
+        saat = emp.mesai_saati
+        if plant and rnd.random() < OVERTIME_RATE:
+            saat = round(rnd.uniform(49, 80), 1)
+            planted.add((emp.name, "overtime"))
+
+        bes = round(emp.maas * 0.03, 2)
+        banka = round(emp.maas + emp.mesai + emp.yardim - bes, 2)
+        if plant and rnd.random() < BALANCE_RATE:
+            banka += 500
+            planted.add((emp.name, "balance"))
+
+        rows.append([
+            str(i + 1), emp.name, "", "", "30", "", money(saat), money(emp.maas), money(emp.mesai),
+            money(0), money(emp.yardim), money(bes), money(0), money(0), money(0), money(banka), money(0),
+        ])
+
+    title = f"ÖRNEK A.Ş. {year} {MONTHS[month - 1]} Dönemi Bordrosu"
+    row_height = _row_height(rows_per_page)
+    page_height = TITLE_HEIGHT + (rows_per_page + 2) * row_height + MARGIN
+    contents = []
+    for start in range(0, max(1, len(rows)), rows_per_page):
+        page_rows = [HEADER] + rows[start:start + rows_per_page]
+        if start + rows_per_page >= len(rows):
+            page_rows.append(["TOPLAM"] + [""] * 16)
+        contents.append(_page_content(title, page_rows, page_height, row_height))
+    write_pdf(path, contents, page_height)
+    return GeneratedMonth(path, year, month, len(contents), len(staff), planted)
+
+def generate_pair(
+    directory: str,
+    employees: int,
+    rows_per_page: int = 30,
+    year: int = 2024,
+    month: int = 2,
+    seed: int = 0,
+) -> Tuple[GeneratedMonth, GeneratedMonth]:
+    """(önceki ay, hedef ay); artış kuralının karşılaştıracağı temel ay temiz üretilir"""
+    staff = make_staff(employees, seed)
+    prev_year, prev_month = (year, month - 1) if month > 1 else (year - 1, 12)
+    baseline = generate_month(
+        os.path.join(directory, f"bordro_{prev_year}_{prev_month:02d}.pdf"),
+        staff, prev_year, prev_month, rows_per_page, plant=False, seed=seed,
+    )
+    current_staff, raises = next_month(staff, seed + 1)
+    target = generate_month(
+        os.path.join(directory, f"bordro_{year}_{month:02d}.pdf"),
+        current_staff, year, month, rows_per_page, plant=True, seed=seed + 2,
+    )
+    target.planted.update((name, rule) for name, rule in raises.items())
+    return baseline, target
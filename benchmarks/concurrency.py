@@ -0,0 +1,244 @@
+"""Eşzamanlı yükleme ölçümü: N yükleme aynı anda gelirken toplam süre ve okuma gecikmesi.
+
+Kullanım (depo kökünden):
+    python -m benchmarks.concurrency                         # 3 eşzamanlı yükleme, dosya başına 20.000 personel
+    python -m benchmarks.concurrency --uploads 5 --employees 50000 -o eszamanli.json
+
+Her yükleme farklı bir ayın bordrosudur (/analyze-local). Yüklemeler sürerken ayrı bir
+iş parçacığı /anomalies ve /summary uçlarını kısa aralıklarla okur ve yanıt sürelerini kaydeder.
+Varsayılan olarak dosyalar önce sırayla bir kez işlenip ayrıştırma önbelleği doldurulur;
+böylece ölçülen süre PDF ayrıştırmadan çok anomali tespiti ve veritabanı yazmasıdır.
+
+Her çalıştırmadan sonra yazıcı kontrol edilir: tüm yüklemeler kaydedilmiş, hiçbir yazma
+başarısız olmamış ve grup sayısı istek sayısını aşmamış olmalıdır. --queue-size ile yazma kuyruğu
+küçültülerek geri basınç altında da aynı kontroller yapılır; başarısız kontrolde çıkış kodu 1'dir.
+Grupların birleşip birleşmediği zamanlamaya bağlıdır; yalnızca raporlanır.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from benchmarks.bordro_gen import generate_month, make_staff, next_month
+from benchmarks.startup import REPO_ROOT, URL, STARTUP_GAUGE, _get
+
+READ_PATHS = ("/api/v1/anomalies?limit=100", "/api/v1/summary")
+WRITE_COUNTER = re.compile(r'^maas_(write_\w+_total) ([0-9.eE+-]+)$', re.M)
+
+def _write_counters() -> Dict[str, float]:
+    """/metrics'teki yazıcı sayaçları"""
+    return {name: float(value) for name, value in WRITE_COUNTER.findall(_get("/metrics") or "")}
+
+def _request(method: str, path: str, timeout: float) -> float:
+    """İstek süresi (saniye); HTTP hatasında istisna"""
+    request = urllib.request.Request(URL + path, data=b"" if method == "POST" else None, method=method)
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - start
+
+def generate_files(work_dir: str, uploads: int, employees: int) -> List[str]:
+    """Aynı kadronun art arda aylarına ait bordrolar"""
+    staff = make_staff(employees)
+    names = []
+    for i in range(uploads):
+        month = i + 1
+        name = f"bordro_2024_{month:02d}.pdf"
+        generate_month(os.path.join(work_dir, name), staff, 2024, month, plant=i > 0, seed=i)
+        names.append(name)
+        staff, _ = next_month(staff, seed=i + 1)
+    return names
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+
+def measure(files: List[str], timeout: float, read_interval: float) -> Dict[str, Any]:
+    upload_times: Dict[str, float] = {}
+    errors: List[str] = []
+    read_times: Dict[str, List[float]] = {path: [] for path in READ_PATHS}
+    done = threading.Event()
+    barrier = threading.Barrier(len(files) + 1)
+
+    def upload(name: str):
+        barrier.wait()
+        try:
+            upload_times[name] = _request("POST", f"/api/v1/analyze-local?filename={name}", timeout)
+        except OSError as e:
+            errors.append(f"{name}: {e}")
+
+    def read():
+        barrier.wait()
+        i = 0
+        while not done.is_set():
+            try:
+                path = READ_PATHS[i % len(READ_PATHS)]
+                read_times[path].append(_request("GET", path, timeout))
+            except OSError as e:
+                errors.append(f"okuma: {e}")
+            i += 1
+            done.wait(read_interval)
+
+    reader = threading.Thread(target=read)
+    uploaders = [threading.Thread(target=upload, args=(name,)) for name in files]
+    before = _write_counters()
+    reader.start()
+    for thread in uploaders:
+        thread.start()
+    start = time.perf_counter()
+    for thread in uploaders:
+        thread.join()
+    wall = time.perf_counter() - start
+    done.set()
+    reader.join()
+    after = _write_counters()
+    summary = json.loads(_get("/api/v1/summary", timeout) or "{}")
+
+    all_reads = [seconds for times in read_times.values() for seconds in times]
+    return {
+        "wall_seconds": round(wall, 4),
+        "upload_seconds": {name: round(seconds, 4) for name, seconds in sorted(upload_times.items())},
+        "reads": len(all_reads),
+        "read_p50": _percentile(all_reads, 0.5),
+        "read_p95": _percentile(all_reads, 0.95),
+        "read_max": _percentile(all_reads, 1.0),
+        "read_by_path": {
+            path: {"p50": _percentile(times, 0.5), "p95": _percentile(times, 0.95), "max": _percentile(times, 1.0)}
+            for path, times in read_times.items()
+        },
+        "errors": errors,
+        "records": summary.get("overall", {}).get("records"),
+        "writes": {name: after.get(name, 0) - before.get(name, 0) for name in after},
+    }
+
+def check(result: Dict[str, Any], uploads: int, employees: int) -> List[str]:
+    """Eşzamanlı yazmaların doğruluğu; boş liste: tüm kontroller geçti"""
+    failures = []
+    writes = result["writes"]
+    requests, groups = writes.get("write_requests_total", 0), writes.get("write_groups_total", 0)
+    if result["errors"]:
+        failures.append(f"{len(result['errors'])} istek hata verdi")
+    if result["records"] != uploads * employees:
+        failures.append(f"kayıt sayısı {result['records']}, beklenen {uploads * employees}")
+    if writes.get("write_failures_total", 0):
+        failures.append(f"{writes['write_failures_total']:.0f} yazma başarısız")
+    # Her yükleme en az bir yazma isteğidir (düşük bellek modunda birden fazla)
+    if requests < uploads:
+        failures.append(f"{requests:.0f} yazma isteği, en az {uploads} bekleniyordu")
+    if not 0 < groups <= requests:
+        failures.append(f"{groups:.0f} yazma grubu, {requests:.0f} istek için geçersiz")
+    return failures
+
+def run(args) -> Dict[str, Any]:
+    work_dir = tempfile.mkdtemp(prefix="maas-concurrency-")
+    proc = None
+    try:
+        t0 = time.perf_counter()
+        files = generate_files(work_dir, args.uploads, args.employees)
+        print(f"{len(files)} PDF üretildi ({args.employees} personel, {time.perf_counter() - t0:.1f} sn)", flush=True)
+
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+        if args.queue_size:
+            env["WRITE_QUEUE_SIZE"] = str(args.queue_size)
+        proc = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "MaasAnomali.py")], cwd=work_dir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.perf_counter() + args.timeout
+        while "prewarm" not in dict(STARTUP_GAUGE.findall(_get("/metrics") or "")):
+            if proc.poll() is not None:
+                raise RuntimeError(f"Uygulama beklenmedik şekilde kapandı (kod {proc.returncode})")
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"Uygulama {args.timeout:.0f} sn içinde hazır olmadı")
+            time.sleep(0.05)
+
+        if not args.cold:
+            for name in files:
+                _request("POST", f"/api/v1/analyze-local?filename={name}", args.timeout)
+
+        runs = []
+        for i in range(args.repeat):
+            _request("DELETE", "/api/v1/clear", args.timeout)
+            result = measure(files, args.timeout, args.read_interval)
+            result["failures"] = check(result, len(files), args.employees)
+            runs.append(result)
+            print(f"[{i + 1}/{args.repeat}] toplam {result['wall_seconds']:.3f} sn, "
+                  f"okuma p50 {result['read_p50']} sn / p95 {result['read_p95']} sn / en kötü {result['read_max']} sn "
+                  f"({result['reads']} okuma), hata {len(result['errors'])}", flush=True)
+            for path, stats in result["read_by_path"].items():
+                print(f"    {path}: p50 {stats['p50']} sn, p95 {stats['p95']} sn, en kötü {stats['max']} sn", flush=True)
+            writes = result["writes"]
+            print(f"    yazıcı: {writes.get('write_requests_total', 0):.0f} istek, "
+                  f"{writes.get('write_groups_total', 0):.0f} grup", flush=True)
+            for failure in result["failures"]:
+                print(f"    KONTROL BAŞARISIZ: {failure}", flush=True)
+        return {"files": files, "runs": runs}
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Eşzamanlı yüklemelerde toplam süreyi ve okuma gecikmesini ölçer")
+    parser.add_argument("--uploads", type=int, default=3, help="Aynı anda gönderilen yükleme sayısı")
+    parser.add_argument("--employees", type=int, default=20000, help="Dosya başına personel")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--read-interval", type=float, default=0.05, help="Okumalar arası bekleme (sn)")
+    parser.add_argument("--cold", action="store_true", help="Ayrıştırma önbelleği doldurulmadan ölç")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="Sunucunun WRITE_QUEUE_SIZE değeri; küçük değer geri basıncı zorlar")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("-o", "--output", default=None, help="Sonuç JSON dosyası")
+    args = parser.parse_args(argv)
+
+    measured = run(args)
+    runs = measured["runs"]
+    records = args.uploads * args.employees
+    wall = statistics.median(run["wall_seconds"] for run in runs)
+    summary = {
+        "wall_seconds": round(wall, 4),
+        "rows_per_second": round(records / wall, 1) if wall else None,
+        "read_p50": round(statistics.median(run["read_p50"] for run in runs if run["read_p50"] is not None), 4),
+        "read_p95": round(statistics.median(run["read_p95"] for run in runs if run["read_p95"] is not None), 4),
+        "read_max": max(run["read_max"] for run in runs if run["read_max"] is not None),
+        "errors": sum(len(run["errors"]) for run in runs),
+        "failed_checks": sum(len(run["failures"]) for run in runs),
+    }
+    print(f"medyan toplam {summary['wall_seconds']:.3f} sn ({summary['rows_per_second']} satır/sn), "
+          f"okuma p50 {summary['read_p50']} sn, p95 {summary['read_p95']} sn, en kötü {summary['read_max']} sn")
+
+    if args.output:
+        result = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "uploads": args.uploads,
+            "employees": args.employees,
+            "cold": args.cold,
+            "queue_size": args.queue_size,
+            "runs": runs,
+            "summary": summary,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Sonuçlar yazıldı: {args.output}")
+    return 1 if summary["failed_checks"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
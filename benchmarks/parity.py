@@ -0,0 +1,129 @@
+"""PDF motorlarının karşılaştırması: aynı dosyalardan birebir aynı kayıtlar çıkıyor mu, hangisi ne kadar hızlı.
+
+Kullanım (depo kökünden):
+    python -m benchmarks.parity                              # 3 sentetik bordro (dosya başına 3000 personel)
+    python -m benchmarks.parity bordro1.pdf bordro2.pdf      # gerçek dosyalar
+    python -m benchmarks.parity --employees 20000 -o parite.json
+
+Her motor dosyanın tüm sayfalarını bu süreçte (işçi havuzu ve ayrıştırma önbelleği olmadan) okur.
+Dönem, personel sırası ve PayrollRecord alanlarının tamamı tam eşitlikle karşılaştırılır;
+fark varsa ilk farklar yazılır ve çıkış kodu 1 olur.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.bordro_gen import generate_month, make_staff, next_month
+from src.app.services import pdf_service
+from src.app.services.payroll_batch import PayrollBatch
+from src.app.services.pdf_extractors import EXTRACTORS
+
+# Dosya başına yazdırılan en fazla fark
+MAX_REPORTED_DIFFS = 5
+
+def parse_with(path: str, engine: str) -> Tuple[PayrollBatch, float]:
+    """(parti, saniye); belge önbelleği ölçümden önce boşaltılır"""
+    pdf_service.close_documents()
+    start = time.perf_counter()
+    num_pages = pdf_service.count_pages(path, engine)
+    batch, _, _ = pdf_service.process_page_chunk(path, list(range(num_pages)), engine)
+    return batch, time.perf_counter() - start
+
+def differences(expected: PayrollBatch, actual: PayrollBatch) -> List[str]:
+    diffs = []
+    if expected.period != actual.period:
+        diffs.append(f"dönem: {expected.period} != {actual.period}")
+    if len(expected) != len(actual):
+        diffs.append(f"kayıt sayısı: {len(expected)} != {len(actual)}")
+    for i, (a, b) in enumerate(zip(expected.rows(), actual.rows())):
+        if a != b:
+            fields = sorted(key for key in a if a[key] != b.get(key))
+            diffs.append(f"satır {i + 1} ({a['personel_ad']}): " + ", ".join(f"{k} {a[k]!r} != {b[k]!r}" for k in fields))
+    return diffs
+
+def generate_files(work_dir: str, count: int, employees: int) -> List[str]:
+    staff = make_staff(employees)
+    paths = []
+    for i in range(count):
+        path = os.path.join(work_dir, f"bordro_2024_{i + 1:02d}.pdf")
+        generate_month(path, staff, 2024, i + 1, plant=i > 0, seed=i)
+        paths.append(path)
+        staff, _ = next_month(staff, seed=i + 1)
+    return paths
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="PDF motorlarının çıktısını ve hızını karşılaştırır")
+    parser.add_argument("files", nargs="*", help="PDF dosyaları (verilmezse sentetik bordro üretilir)")
+    parser.add_argument("--engines", default=",".join(EXTRACTORS), help="virgülle ayrılmış; ilki referans alınır")
+    parser.add_argument("--count", type=int, default=3, help="üretilecek sentetik dosya sayısı")
+    parser.add_argument("--employees", type=int, default=3000, help="sentetik dosya başına personel")
+    parser.add_argument("-o", "--output", default=None, help="Sonuç JSON dosyası")
+    args = parser.parse_args(argv)
+    engines = args.engines.split(",")
+
+    work_dir = None
+    paths = args.files
+    if not paths:
+        work_dir = tempfile.mkdtemp(prefix="maas-parity-")
+        paths = generate_files(work_dir, args.count, args.employees)
+
+    files: List[Dict[str, Any]] = []
+    totals = dict.fromkeys(engines, 0.0)
+    mismatches = 0
+    try:
+        for path in paths:
+            reference, seconds = parse_with(path, engines[0])
+            timings = {engines[0]: round(seconds, 4)}
+            diffs: Dict[str, List[str]] = {}
+            for engine in engines[1:]:
+                batch, seconds = parse_with(path, engine)
+                timings[engine] = round(seconds, 4)
+                found = differences(reference, batch)
+                if found:
+                    diffs[engine] = found
+            for engine, seconds in timings.items():
+                totals[engine] += seconds
+            mismatches += bool(diffs)
+
+            name = os.path.basename(path)
+            status = "FARKLI" if diffs else "aynı"
+            print(f"{name}: {len(reference)} kayıt, {status}, " +
+                  ", ".join(f"{engine} {seconds:.3f} sn" for engine, seconds in timings.items()), flush=True)
+            for engine, found in diffs.items():
+                for line in found[:MAX_REPORTED_DIFFS]:
+                    print(f"    [{engine}] {line}")
+            files.append({"file": name, "records": len(reference), "seconds": timings, "diffs": diffs})
+    finally:
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    reference_total = totals[engines[0]]
+    print(f"{len(files)} dosya, {mismatches} farklı; toplam " + ", ".join(
+        f"{engine} {seconds:.3f} sn" + (f" ({reference_total / seconds:.1f}x)" if i and seconds else "")
+        for i, (engine, seconds) in enumerate(totals.items())
+    ))
+
+    if args.output:
+        result = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engines": engines,
+            "files": files,
+            "total_seconds": {engine: round(seconds, 4) for engine, seconds in totals.items()},
+            "mismatches": mismatches,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Sonuçlar yazıldı: {args.output}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
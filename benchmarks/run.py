@@ -0,0 +1,261 @@
+"""Bordro işleme hattı için tekrarlanabilir performans ölçümü.
+
+Kullanım (depo kökünden):
+    python -m benchmarks.run                       # varsayılan senaryolar (s, m)
+    python -m benchmarks.run -s xl --repeat 1      # 1000 sayfa / 100k personel
+    python -m benchmarks.run --pages 50 --employees 2000
+    python -m benchmarks.run -o yeni.json --compare eski.json
+
+Her senaryo için önceki ay ve hedef ay PDF'leri üretilir, ardından sırasıyla
+ayrıştırma, anomali tespiti, veritabanına yazma ve /upload uçtan uca süresi ölçülür.
+Sonuçlar JSON olarak yazılır; --compare ile iki çalıştırma karşılaştırılır.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.bordro_gen import generate_pair  # noqa: E402
+
+# ad: (personel sayısı, sayfa başına satır) -> sayfa sayısı = ceil(personel / satır)
+SCENARIOS: Dict[str, Tuple[int, int]] = {
+    "s": (100, 10),        # 10 sayfa
+    "m": (3000, 30),       # 100 sayfa
+    "l": (10000, 50),      # 200 sayfa
+    "xl": (100000, 100),   # 1000 sayfa
+}
+DEFAULT_SCENARIOS = ["s", "m"]
+
+# Karşılaştırmada bu oranın üstündeki yavaşlamalar işaretlenir
+REGRESSION_THRESHOLD = 1.10
+
+def _rules_of(anomaly: Dict[str, Any]) -> Set[str]:
+    rules = set()
+    for issue in anomaly["issues"]:
+        if "dengesizliği" in issue:
+            rules.add("balance")
+        elif "artış" in issue:
+            rules.add("increase")
+        elif "Mesai" in issue:
+            rules.add("overtime")
+    return rules
+
+def detection_summary(anomalies: List[Dict[str, Any]], planted: Set[Tuple[str, str]]) -> Dict[str, int]:
+    found = {(a["personel_ad"], rule) for a in anomalies for rule in _rules_of(a)}
+    return {
+        "planted": len(planted),
+        "detected": len(found & planted),
+        "unexpected": len(found - planted),
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _stats(samples: List[float]) -> Dict[str, Any]:
+    return {
+        "min": round(min(samples), 4),
+        "median": round(statistics.median(samples), 4),
+        "samples": [round(s, 4) for s in samples],
+    }
+
+async def _reset_db():
+    from sqlalchemy import delete
+    from src.app.db.models import Base, PayrollAnomaly, PayrollRecord
+    from src.app.db.session import engine, SessionLocal
+    from src.app.services.history_index import history_index
+    from src.app.services.summary_service import summary_cache
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        await db.execute(delete(PayrollAnomaly))
+        await db.execute(delete(PayrollRecord))
+        await db.commit()
+    history_index.clear()
+    summary_cache.clear()
+
+async def _measure_db(baseline_records, target_records) -> Dict[str, Any]:
+    """Temel ay yazıldıktan sonra hedef ayın anomali ve yazma süreleri"""
+    from src.app.db.bulk import upsert_batch
+    from src.app.db.session import engine, SessionLocal
+    from src.app.services.anomaly_service import AnomalyService
+
+    await _reset_db()
+    async with SessionLocal() as db:
+        await upsert_batch(db, baseline_records)
+        await db.commit()
+        await AnomalyService.refresh_materialized(db, {baseline_records.period})
+        await db.commit()
+
+        t0 = time.perf_counter()
+        anomalies = await AnomalyService.get_anomalies(db, target_records)
+        t1 = time.perf_counter()
+        await upsert_batch(db, target_records)
+        await db.flush()
+        t2 = time.perf_counter()
+        # Yazıcıdaki gibi kayıtlar ve anomaliler tek işlemde commit edilir
+        await AnomalyService.refresh_materialized(db, {target_records.period})
+        await db.commit()
+        t3 = time.perf_counter()
+
+    # Bağlantılar bu olay döngüsüne ait; sonraki adımlar yeni döngüde açar
+    await engine.dispose()
+    return {"anomalies": anomalies, "anomalies_s": t1 - t0, "commit_s": t2 - t1, "materialize_s": t3 - t2}
+
+def _measure_upload(baseline_path: str, target_path: str) -> Tuple[float, List[Dict[str, Any]]]:
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+
+    with TestClient(app) as client:
+        with open(baseline_path, "rb") as f:
+            client.post("/api/v1/upload", files={"file": (os.path.basename(baseline_path), f, "application/pdf")})
+        with open(target_path, "rb") as f:
+            t0 = time.perf_counter()
+            resp = client.post("/api/v1/upload", files={"file": (os.path.basename(target_path), f, "application/pdf")})
+            elapsed = time.perf_counter() - t0
+        resp.raise_for_status()
+        return elapsed, resp.json()["anomalies"]
+
+def run_scenario(name: str, employees: int, rows_per_page: int, repeat: int, work_dir: str) -> Dict[str, Any]:
+    from src.app.services import worker_pool
+    from src.app.services.pdf_service import parse_payroll_pdf
+
+    scenario_dir = os.path.join(work_dir, name)
+    os.makedirs(scenario_dir, exist_ok=True)
+    t0 = time.perf_counter()
+    baseline, target = generate_pair(scenario_dir, employees, rows_per_page)
+    generate_s = time.perf_counter() - t0
+    print(f"[{name}] {target.pages} sayfa, {employees} personel (üretim {generate_s:.1f} sn)", flush=True)
+
+
+    timings: Dict[str, List[float]] = {"parse_s": [], "anomalies_s": [], "commit_s": [], "materialize_s": [], "upload_s": []}
+    detection = {}
+    records = 0
+    for _ in range(repeat):
+        # /upload adımındaki uygulama kapanışı havuzu durdurur; temel ay ayrıştırması havuzu ısıtır
+        worker_pool.start_pool()
+        baseline_records = parse_payroll_pdf(baseline.path)
+        t0 = time.perf_counter()
+        target_records = parse_payroll_pdf(target.path)
+        timings["parse_s"].append(time.perf_counter() - t0)
+        records = len(target_records)
+
+        db_result = asyncio.run(_measure_db(baseline_records, target_records))
+        for key in ("anomalies_s", "commit_s", "materialize_s"):
+            timings[key].append(db_result[key])
+        detection = detection_summary(db_result["anomalies"], target.planted)
+
+        upload_s, upload_anomalies = _measure_upload(baseline.path, target.path)
+        timings["upload_s"].append(upload_s)
+        detection["upload_matches"] = detection_summary(upload_anomalies, target.planted) == {
+            k: detection[k] for k in ("planted", "detected", "unexpected")
+        }
+
+    result = {
+        "name": name,
+        "pages": target.pages,
+        "employees": employees,
+        "records": records,
+        "detection": detection,
+        "timings": {key: _stats(values) for key, values in timings.items()},
+    }
+    parse_min = result["timings"]["parse_s"]["min"]
+    result["pages_per_s"] = round(target.pages / parse_min, 2) if parse_min else None
+    print(f"[{name}] " + ", ".join(f"{k}={v['median']:.3f}" for k, v in result["timings"].items()), flush=True)
+    return result
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+    """Ortak senaryolarda medyan süre oranları; eşik üstü yavaşlamalar işaretlenir"""
+    lines = []
+    old = {s["name"]: s for s in previous.get("scenarios", [])}
+    for scenario in current["scenarios"]:
+        before = old.get(scenario["name"])
+        if before is None:
+            continue
+        for key, stats in scenario["timings"].items():
+            prev_stats = before["timings"].get(key)
+            if not prev_stats or not prev_stats["median"]:
+                continue
+            ratio = stats["median"] / prev_stats["median"]
+            mark = "  <-- yavaşlama" if ratio > REGRESSION_THRESHOLD else ""
+            lines.append(f"{scenario['name']:>4} {key:<14} {prev_stats['median']:>9.3f} -> {stats['median']:>9.3f}  x{ratio:.2f}{mark}")
+    return lines
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bordro işleme performans ölçümü")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="tekrarlanabilir")
+    parser.add_argument("--pages", type=int, help="özel senaryo: sayfa sayısı")
+    parser.add_argument("--employees", type=int, help="özel senaryo: personel sayısı")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="JSON sonuç dosyası (verilmezse ekrana yazılır)")
+    parser.add_argument("--compare", help="önceki bir çalıştırmanın JSON dosyası")
+    parser.add_argument("--work-dir", help="PDF ve veritabanı dizini (varsayılan: geçici dizin)")
+    args = parser.parse_args(argv)
+
+    scenarios = [(name, *SCENARIOS[name]) for name in (args.scenario or [])]
+    if args.pages or args.employees:
+        pages = args.pages or 10
+        employees = args.employees or pages * 30
+        scenarios.append(("custom", employees, math.ceil(employees / pages)))
+    if not scenarios:
+        scenarios = [(name, *SCENARIOS[name]) for name in DEFAULT_SCENARIOS]
+
+    # Göreli yollar çalışma dizini değişmeden çözülür
+    output = os.path.abspath(args.output) if args.output else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="maas_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    # data.db ve parse_cache.db çalışma dizinine (settings.BASE_DIR) yazılır
+    os.chdir(work_dir)
+    from src.app.core.config import settings
+    # Her tekrar gerçek ayrıştırmayı ölçsün
+    settings.PARSE_CACHE_ENABLED = False
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parse_workers": settings.PARSE_WORKERS or os.cpu_count(),
+        "repeat": args.repeat,
+        "scenarios": [run_scenario(name, emp, rpp, args.repeat, work_dir) for name, emp, rpp in scenarios],
+    }
+
+    from src.app.services import worker_pool
+    worker_pool.shutdown_pool()
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if compare_path:
+        with open(compare_path, encoding="utf-8") as f:
+            for line in compare(results, json.load(f)):
+                print(line)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
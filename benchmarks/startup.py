@@ -0,0 +1,152 @@
+"""Soğuk başlangıç ölçümü: süreç açılışından /healthz yanıtına kadar geçen süre.
+
+Kullanım (depo kökünden):
+    python -m benchmarks.startup                   # MaasAnomali.py, boş veritabanı
+    python -m benchmarks.startup --rows 200000     # önceki oturumdan kalmış büyük data.db
+    python -m benchmarks.startup --exe dist/MaasAnomali.exe --repeat 3
+
+Her tekrarda uygulama boş bir çalışma dizininde açılır; sunucu yanıt verene kadar
+beklenir, ardından /metrics üzerindeki maas_startup_seconds aşamaları okunur.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+URL = "http://127.0.0.1:8000"
+STARTUP_GAUGE = re.compile(r'^maas_startup_seconds\{stage="([^"]+)"\} ([0-9.eE+-]+)$', re.M)
+
+def populate_database(path: str, rows: int):
+    """Önceki oturumdan kalmış gibi dolu bir data.db hazırlar"""
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    from sqlalchemy import create_engine
+    from src.app.db.models import Base
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    months = [date(2024, m, 1).isoformat() for m in range(1, 13)]
+    per_month = max(1, rows // len(months))
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO payroll_records (personel_ad, donem, maas, mesai, mesai_saati, ek, yardim, "
+        "bes, avans, icra, borc, banka, kasa) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((f"PERSONEL {i:06d}", month, 30000.0, 1500.0, 10.0, 0.0, 500.0,
+          900.0, 0.0, 0.0, 0.0, 31100.0, 0.0)
+         for month in months for i in range(per_month))
+    )
+    conn.commit()
+    conn.close()
+
+def _get(path: str, timeout: float = 1.0) -> Optional[str]:
+    try:
+        with urllib.request.urlopen(URL + path, timeout=timeout) as response:
+            return response.read().decode("utf-8")
+    except OSError:
+        return None
+
+def measure_once(command: List[str], work_dir: str, rows: int, timeout: float) -> Dict[str, Any]:
+    if rows:
+        populate_database(os.path.join(work_dir, "data.db"), rows)
+
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=work_dir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        healthy = None
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Uygulama beklenmedik şekilde kapandı (kod {proc.returncode})")
+            if _get("/healthz", timeout=0.2) is not None:
+                healthy = time.perf_counter() - start
+                break
+            time.sleep(0.01)
+        if healthy is None:
+            raise RuntimeError(f"Uygulama {timeout:.0f} sn içinde yanıt vermedi")
+
+        # Arka plandaki ısınmanın bitmesi beklenir (işçi havuzu hazır)
+        stages: Dict[str, float] = {}
+        while time.perf_counter() - start < timeout:
+            stages = {name: float(value) for name, value in STARTUP_GAUGE.findall(_get("/metrics") or "")}
+            if "prewarm" in stages:
+                break
+            time.sleep(0.05)
+        return {"healthz_seconds": round(healthy, 4), "stages": stages}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    keys = ["healthz_seconds"] + sorted({stage for run in runs for stage in run["stages"]})
+    summary = {}
+    for key in keys:
+        values = [run[key] if key == "healthz_seconds" else run["stages"].get(key) for run in runs]
+        values = [v for v in values if v is not None]
+        if values:
+            summary[key] = {"median": round(statistics.median(values), 4), "min": round(min(values), 4)}
+    return summary
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Uygulamanın soğuk başlangıç süresini ölçer")
+    parser.add_argument("--exe", help="Paketlenmiş uygulama (varsayılan: python MaasAnomali.py)")
+    parser.add_argument("--rows", type=int, default=0, help="Önceden doldurulacak data.db satır sayısı")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("-o", "--output", default=None, help="Sonuç JSON dosyası")
+    args = parser.parse_args(argv)
+
+    if args.exe:
+        command = [os.path.abspath(args.exe)]
+    else:
+        command = [sys.executable, os.path.join(REPO_ROOT, "MaasAnomali.py")]
+
+    runs = []
+    for i in range(args.repeat):
+        work_dir = tempfile.mkdtemp(prefix="maas-startup-")
+        try:
+            run = measure_once(command, work_dir, args.rows, args.timeout)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        runs.append(run)
+        stages = ", ".join(f"{name}={value:.3f}" for name, value in run["stages"].items())
+        print(f"[{i + 1}/{args.repeat}] /healthz {run['healthz_seconds']:.3f} sn  ({stages})")
+
+    result = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "command": command,
+        "rows": args.rows,
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+    for key, values in result["summary"].items():
+        print(f"{key:>18}: medyan {values['median']:.3f} sn, en iyi {values['min']:.3f} sn")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Sonuçlar yazıldı: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -29,6 +29,34 @@ interface Anomaly {
     details: AnomalyDetails | null;
 }
 
+interface StreamFrame {
+    type: 'chunk' | 'summary' | 'error';
+    pages_done?: number;
+    total_pages?: number;
+    anomalies?: Anomaly[];
+    message?: string;
+    detail?: string;
+}
+
+// NDJSON akışını satır satır okuyup her çerçeveyi geri çağırır
+const readStream = async (resp: Response, onFrame: (frame: StreamFrame) => void) => {
+    if (!resp.body) return
+    const reader = resp.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const lines = buffer.split('\n')
+        buffer = lines.pop() || ''
+        for (const line of lines) {
+            if (line.trim()) onFrame(JSON.parse(line))
+        }
+    }
+    if (buffer.trim()) onFrame(JSON.parse(buffer))
+}
+
 function App() {
     const [anomalies, setAnomalies] = useState<Anomaly[]>([])
     const [localFiles, setLocalFiles] = useState<string[]>([])
@@ -45,16 +73,32 @@ function App() {
 
     const fetchAnomalies = async () => {
         try {
-            const resp = await fetch('/api/v1/anomalies')
-            if (resp.ok) {
-                const data = await resp.json()
-                setAnomalies(data)
-            }
+            // Sunucu sayfalı döner; imleç bitene kadar sayfalar toplanır
+            let all: Anomaly[] = []
+            let cursor: string | null = null
+            do {
+                const params = new URLSearchParams({ limit: '1000' })
+                if (cursor) params.set('cursor', cursor)
+                const resp = await fetch(`/api/v1/anomalies?${params}`)
+                if (!resp.ok) return
+                const data: { items: Anomaly[]; next_cursor: string | null } = await resp.json()
+                all = all.concat(data.items)
+                cursor = data.next_cursor
+            } while (cursor)
+            setAnomalies(all)
         } catch (err) {
             console.error("Fetch anomalies failed", err)
         }
     }
 
+    const onStreamFrame = (frame: StreamFrame) => {
+        if (frame.type === 'chunk' && frame.anomalies && frame.anomalies.length > 0) {
+            setAnomalies(prev => [...prev, ...frame.anomalies!])
+        } else if (frame.type === 'error') {
+            console.error("Stream error", frame.detail)
+        }
+    }
+
     const fetchLocalFiles = async () => {
         try {
             const resp = await fetch('/api/v1/files')
@@ -81,13 +125,15 @@ function App() {
             formData.append('file', files[i])
 
             try {
-                const resp = await fetch('/api/v1/upload', {
+                const resp = await fetch('/api/v1/upload?stream=true', {
                     method: 'POST',
                     body: formData
                 })
 
                 if (!resp.ok) {
                     console.error("Upload error for", files[i].name)
+                } else {
+                    await readStream(resp, onStreamFrame)
                 }
             } catch (err) {
                 console.error("Network error for", files[i].name)
@@ -106,17 +152,17 @@ function App() {
         setMessage(`Toplu analiz başlatıldı: ${selectedFiles.length} dosya`)
         setUploadProgress({ current: 0, total: selectedFiles.length })
 
-        for (let i = 0; i < selectedFiles.length; i++) {
-            const filename = selectedFiles[i];
-            setUploadProgress(prev => ({ ...prev, current: i + 1 }))
-            try {
-                const resp = await fetch(`/api/v1/analyze-local?filename=${encodeURIComponent(filename)}`, {
-                    method: 'POST'
-                })
-                if (!resp.ok) console.error("Batch error for", filename)
-            } catch (err) {
-                console.error("Network error for", filename)
-            }
+        // Tüm dosyalar tek istekte gönderilir; sunucu sayfaları ortak kuyrukta işler
+        const params = new URLSearchParams()
+        selectedFiles.forEach(f => params.append('filenames', f))
+        try {
+            const resp = await fetch(`/api/v1/analyze-local/batch?${params.toString()}`, {
+                method: 'POST'
+            })
+            if (!resp.ok) console.error("Batch error")
+            setUploadProgress(prev => ({ ...prev, current: selectedFiles.length }))
+        } catch (err) {
+            console.error("Network error for batch")
         }
 
         setSelectedFiles([])
@@ -249,9 +295,18 @@ function App() {
                             </button>
                         </div>
                     </div>
-                    <button className="btn" onClick={() => window.print()}>
-                        <Download size={18} /> Raporu Yazdır
-                    </button>
+                    <div style={{ display: 'flex', gap: '0.5rem' }}>
+                        <a
+                            className="btn btn-outline"
+                            href={`/api/v1/export/anomalies?format=csv${filter !== 'all' ? `&category=${encodeURIComponent(filter)}` : ''}`}
+                            download
+                        >
+                            <FileText size={18} /> Excel'e Aktar (CSV)
+                        </a>
+                        <button className="btn" onClick={() => window.print()}>
+                            <Download size={18} /> Raporu Yazdır
+                        </button>
+                    </div>
                 </div>
 
                 {filteredAnomalies.length === 0 ? (
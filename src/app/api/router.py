@@ -1,42 +1,125 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.app.db.session import get_db
-from src.app.services.pdf_service import parse_payroll_pdf
+from src.app.db.session import get_db, get_read_db
+from src.app.db.bulk import DuplicateRecordError
 from src.app.services.anomaly_service import AnomalyService
-from src.app.db.models import PayrollRecord
-from typing import List
-import shutil
+from src.app.services.anomaly_engine import OUTLIER_WINDOW, RuleThresholds
+from src.app.services.ingest_service import stream_ingest, ndjson_frames, ingest_files, ingest_bounded
+from src.app.services.job_service import job_manager
+from src.app.services import export_service
+from src.app.services.summary_service import MAX_TOP_INCREASES, combine_summaries, summary_cache
+from src.app.services.what_if_service import what_if_snapshot
+from src.app.services.write_queue import write_queue
+from src.app.core.metrics import metrics, stage, start_request_timings, server_timing
+from src.app.services.upload_buffer import DocumentSource, UploadBuffer, receive_upload
+from starlette.concurrency import run_in_threadpool
+from src.app.db.models import PayrollRecord, PayrollAnomaly
+from src.app.api.schemas import PayrollRecordPage, AnomalyPage
+from src.app.services.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Cursor, InvalidCursor, decode_cursor, like_prefix, split_page
+)
+from typing import Any, Dict, List, Optional
+from datetime import date
 import os
-import tempfile
 
 api_router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def rule_thresholds(
+    balance_tolerance: Optional[float] = Query(None, ge=0),
+    increase_limit: Optional[float] = Query(None, ge=0),
+    overtime_limit: Optional[float] = Query(None, ge=0),
+    outlier_k: Optional[float] = Query(None, gt=0),
+    outlier_min_history: Optional[int] = Query(None, ge=1, le=OUTLIER_WINDOW),
+    outlier_method: Optional[str] = Query(None, pattern="^(mad|std)$")
+) -> RuleThresholds:
+    """İstek bazlı kural eşikleri; verilmeyenler Settings'ten gelir"""
+    return RuleThresholds.from_settings(
+        balance_tolerance=balance_tolerance, increase_limit=increase_limit, overtime_limit=overtime_limit,
+        outlier_k=outlier_k, outlier_min_history=outlier_min_history, outlier_method=outlier_method
+    )
+
+def _rejected(e: Exception) -> HTTPException:
+    """Eksik okunan veya aynı personeli iki kez içeren dosya kaydedilmez; nedeni istemciye bildirilir"""
+    if isinstance(e, DuplicateRecordError):
+        return HTTPException(status_code=400, detail=str(e))
+    return HTTPException(status_code=400, detail=f"PDF tam okunamadı: {e}")
+
+async def _ingest_single(
+    db: AsyncSession, source: DocumentSource, thresholds: RuleThresholds, digest: Optional[str] = None
+) -> Dict[str, Any]:
+    """Tek dosyanın akışsız analizi ve kaydı; yükleme ve yerel dosya uç noktaları bu yolu paylaşır"""
+    from src.app.core.config import settings
+    from src.app.services.pdf_service import PageExtractionError
+    try:
+        if settings.LOW_MEMORY_MODE:
+            # Dosya tek partide tutulmaz; kayıtlar ayrıştırıldıkça sınırlı partilerle yazılır
+            result = await ingest_bounded(source, digest, thresholds)
+            if result is None:
+                raise HTTPException(status_code=400, detail="PDF'den veri okunamadı veya format geçersiz.")
+            summary, anomalies = result
+            return {"message": summary["message"], "anomalies": anomalies}
+
+        # pdfplumber/pdfminer ilk kullanımda (veya arka plan ısınmasında) yüklenir
+        from src.app.services.pdf_service import parse_payroll_pdf
+        with stage("parse"):
+            batch = await run_in_threadpool(parse_payroll_pdf, source, digest)
+        if not batch:
+            raise HTTPException(status_code=400, detail="PDF'den veri okunamadı veya format geçersiz.")
+        duplicates = batch.duplicate_names()
+        if duplicates:
+            raise DuplicateRecordError(duplicates)
+
+        # Anomaliler kayıt yazılmadan önce hesaplanır
+        with stage("anomalies"):
+            anomalies = await AnomalyService.get_anomalies(db, batch, thresholds)
+
+        # Okuma bağlantısı yazıcı beklenirken tutulmaz
+        await db.close()
+        with stage("commit"):
+            await write_queue.submit([batch])
+    except (PageExtractionError, DuplicateRecordError) as e:
+        raise _rejected(e)
+
+    metrics.inc("uploads_total")
+    metrics.inc("anomalies_detected_total", len(anomalies))
+    return {
+        "message": f"{len(batch)} kayıt başarıyla işlendi.",
+        "anomalies": anomalies
+    }
+
+async def _stream_and_cleanup(upload: UploadBuffer, thresholds: RuleThresholds):
+    try:
+        async for line in ndjson_frames(stream_ingest(upload.source, digest=upload.digest, thresholds=thresholds)):
+            yield line
+    finally:
+        upload.close()
+
 @api_router.post("/upload")
-async def upload_payroll(file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
-    # Save temp file
-    temp_dir = tempfile.mkdtemp()
-    file_path = os.path.join(temp_dir, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+async def upload_payroll(
+    response: Response,
+    file: UploadFile = File(...),
+    stream: bool = False,
+    thresholds: RuleThresholds = Depends(rule_thresholds),
+    db: AsyncSession = Depends(get_read_db)
+):
+    timings = start_request_timings()
+    # Yükleme tek seferde okunur; işçiler paylaşımlı bellekten (büyük dosyada geçici dosyadan) açar
+    with stage("upload_receive"):
+        upload = await receive_upload(file)
     
+    if stream:
+        # Tampon akış bittiğinde bırakılır
+        return StreamingResponse(_stream_and_cleanup(upload, thresholds), media_type=NDJSON_MEDIA_TYPE)
+
     try:
-        records = parse_payroll_pdf(file_path)
-        if not records:
-             raise HTTPException(status_code=400, detail="PDF'den veri okunamadı veya format geçersiz.")
-        
-        # Get anomalies for these new records BEFORE commit
-        anomalies = await AnomalyService.get_anomalies(db, records)
-        
-        # Save to DB
-        db.add_all(records)
-        await db.commit()
-        
-        return {
-            "message": f"{len(records)} kayıt başarıyla işlendi.",
-            "anomalies": anomalies
-        }
+        result = await _ingest_single(db, upload.source, thresholds, upload.digest)
     finally:
-        shutil.rmtree(temp_dir)
+        upload.close()
+    response.headers["Server-Timing"] = server_timing(timings)
+    return result
 
 @api_router.get("/files")
 async def list_local_files():
@@ -46,7 +129,13 @@ async def list_local_files():
     return {"files": files, "base_dir": base_dir}
 
 @api_router.post("/analyze-local")
-async def analyze_local_file(filename: str, db: AsyncSession = Depends(get_db)):
+async def analyze_local_file(
+    response: Response,
+    filename: str,
+    stream: bool = False,
+    thresholds: RuleThresholds = Depends(rule_thresholds),
+    db: AsyncSession = Depends(get_read_db)
+):
     from src.app.core.config import settings
     # Security: Only allow filenames, not paths
     base_name = os.path.basename(filename)
@@ -55,36 +144,204 @@ async def analyze_local_file(filename: str, db: AsyncSession = Depends(get_db)):
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Dosya bulunamadı.")
     
-    records = parse_payroll_pdf(file_path)
-    if not records:
-         raise HTTPException(status_code=400, detail="PDF'den veri okunamadı.")
-    
-    anomalies = await AnomalyService.get_anomalies(db, records)
-    db.add_all(records)
-    await db.commit()
-    
-    return {
-        "message": f"{len(records)} kayıt başarıyla işlendi.",
-        "anomalies": anomalies
-    }
+    if stream:
+        return StreamingResponse(
+            ndjson_frames(stream_ingest(file_path, thresholds=thresholds)), media_type=NDJSON_MEDIA_TYPE
+        )
+
+    timings = start_request_timings()
+    result = await _ingest_single(db, file_path, thresholds)
+    response.headers["Server-Timing"] = server_timing(timings)
+    return result
 
-@api_router.get("/anomalies")
-async def get_all_anomalies(db: AsyncSession = Depends(get_db)):
-    from sqlalchemy import select
-    result = await db.execute(select(PayrollRecord))
-    all_records = result.scalars().all()
-    anomalies = await AnomalyService.get_anomalies(db, all_records)
-    return anomalies
+@api_router.post("/analyze-local/batch")
+async def analyze_local_files(
+    response: Response,
+    filenames: Optional[List[str]] = Query(None),
+    thresholds: RuleThresholds = Depends(rule_thresholds),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Seçilen (verilmezse dizindeki tüm) PDF'ler tek seferde analiz edilir"""
+    from src.app.core.config import settings
+    if not filenames:
+        filenames = sorted(f for f in os.listdir(settings.BASE_DIR) if f.lower().endswith(".pdf"))
+    if not filenames:
+        raise HTTPException(status_code=404, detail="Dizinde PDF dosyası bulunamadı.")
+
+    file_paths = []
+    for filename in dict.fromkeys(filenames):
+        file_path = os.path.join(settings.BASE_DIR, os.path.basename(filename))
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail=f"Dosya bulunamadı: {filename}")
+        file_paths.append(file_path)
+
+    from src.app.services.pdf_service import PageExtractionError
+    timings = start_request_timings()
+    try:
+        result = await ingest_files(db, file_paths, thresholds)
+    except (PageExtractionError, DuplicateRecordError) as e:
+        raise _rejected(e)
+    if not result["total_records"]:
+        raise HTTPException(status_code=400, detail="PDF'lerden veri okunamadı.")
+    response.headers["Server-Timing"] = server_timing(timings)
+    return result
+
+@api_router.post("/jobs", status_code=202)
+async def submit_upload_job(file: UploadFile = File(...), thresholds: RuleThresholds = Depends(rule_thresholds)):
+    upload = await receive_upload(file)
+    # Tampon iş bittiğinde bırakılır
+    job = job_manager.submit(
+        file.filename, upload.source, digest=upload.digest, cleanup=upload.close, thresholds=thresholds
+    )
+    return {"job_id": job.id, "status": job.status}
+
+@api_router.post("/jobs/local", status_code=202)
+async def submit_local_job(filename: str, thresholds: RuleThresholds = Depends(rule_thresholds)):
+    from src.app.core.config import settings
+    base_name = os.path.basename(filename)
+    file_path = os.path.join(settings.BASE_DIR, base_name)
+
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Dosya bulunamadı.")
+
+    job = job_manager.submit(base_name, file_path, thresholds=thresholds)
+    return {"job_id": job.id, "status": job.status}
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı.")
+    return job.to_dict()
+
+@api_router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı.")
+    return {"job_id": job.id, "status": job.status}
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci.")
+
+@api_router.get("/anomalies", response_model=AnomalyPage)
+async def get_all_anomalies(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    donem_from: Optional[date] = None,
+    donem_to: Optional[date] = None,
+    name_prefix: Optional[str] = None,
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    items, next_cursor = await AnomalyService.list_anomalies(
+        db, limit, after=_parse_cursor(cursor),
+        donem_from=donem_from, donem_to=donem_to,
+        name_prefix=name_prefix, category=category
+    )
+    return {"items": items, "next_cursor": next_cursor}
 
 @api_router.delete("/clear")
 async def clear_data(db: AsyncSession = Depends(get_db)):
     from sqlalchemy import delete
-    await db.execute(delete(PayrollRecord))
-    await db.commit()
+    from src.app.services.history_index import history_index
+    # Yazıcının o anki işlemi bitmeden silinmez
+    async with write_queue.exclusive():
+        await db.execute(delete(PayrollAnomaly))
+        await db.execute(delete(PayrollRecord))
+        await db.commit()
+        history_index.clear()
+        summary_cache.clear()
     return {"message": "Tüm veriler başarıyla silindi."}
 
-@api_router.get("/records")
-async def get_records(db: AsyncSession = Depends(get_db)):
-    from sqlalchemy import select
-    result = await db.execute(select(PayrollRecord))
-    return result.scalars().all()
+@api_router.get("/records", response_model=PayrollRecordPage)
+async def get_records(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    donem_from: Optional[date] = None,
+    donem_to: Optional[date] = None,
+    name_prefix: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    from sqlalchemy import select, tuple_
+    query = select(PayrollRecord)
+    after = _parse_cursor(cursor)
+    if after is not None:
+        query = query.where(tuple_(PayrollRecord.personel_ad, PayrollRecord.donem, PayrollRecord.id) > after)
+    if donem_from is not None:
+        query = query.where(PayrollRecord.donem >= donem_from)
+    if donem_to is not None:
+        query = query.where(PayrollRecord.donem <= donem_to)
+    if name_prefix:
+        query = query.where(PayrollRecord.personel_ad.like(like_prefix(name_prefix), escape="\\"))
+
+    query = query.order_by(PayrollRecord.personel_ad, PayrollRecord.donem, PayrollRecord.id).limit(limit + 1)
+    result = await db.execute(query)
+    items, next_cursor = split_page(result.scalars().all(), limit, lambda r: (r.personel_ad, r.donem, r.id))
+    return {"items": items, "next_cursor": next_cursor}
+
+@api_router.get("/summary")
+async def get_summary(
+    donem_from: Optional[date] = None,
+    donem_to: Optional[date] = None,
+    top: int = Query(10, ge=1, le=MAX_TOP_INCREASES),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Dönem başına toplamlar, kategori bazında anomali sayıları, mesai dağılımı ve en yüksek artışlar"""
+    periods = await summary_cache.get(db, donem_from, donem_to)
+    return {
+        "periods": [{**s, "top_increases": s["top_increases"][:top]} for s in periods],
+        "overall": combine_summaries(periods, top)
+    }
+
+@api_router.get("/what-if")
+async def what_if(
+    donem_from: Optional[date] = None,
+    donem_to: Optional[date] = None,
+    thresholds: RuleThresholds = Depends(rule_thresholds),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Kayıtlı veriyi verilen eşiklerle yeniden değerlendirir; kaydedilen anomaliler değişmez.
+
+    Bellekteki personel x ay dizileri üzerinde çalışır; PDF ayrıştırılmaz, veritabanı sorgulanmaz.
+    """
+    return await what_if_snapshot.run(db, thresholds, donem_from, donem_to)
+
+EXPORT_FORMAT = Query("csv", pattern="^(csv|jsonl)$")
+
+def _export_response(rows, kind: str, fmt: str, donem_from: Optional[date], donem_to: Optional[date]) -> StreamingResponse:
+    filename = export_service.export_filename(kind, fmt, donem_from, donem_to)
+    return StreamingResponse(
+        rows, media_type=export_service.EXPORT_FORMATS[fmt][0],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/export/records")
+async def export_records(
+    format: str = EXPORT_FORMAT,
+    donem_from: Optional[date] = None,
+    donem_to: Optional[date] = None,
+    name_prefix: Optional[str] = None
+):
+    """Tüm kayıtlar CSV veya JSON Lines olarak; satırlar veritabanından parça parça akar"""
+    rows = export_service.export_records(format, donem_from=donem_from, donem_to=donem_to, name_prefix=name_prefix)
+    return _export_response(rows, "kayitlar", format, donem_from, donem_to)
+
+@api_router.get("/export/anomalies")
+async def export_anomalies(
+    format: str = EXPORT_FORMAT,
+    donem_from: Optional[date] = None,
+    donem_to: Optional[date] = None,
+    name_prefix: Optional[str] = None,
+    category: Optional[str] = None
+):
+    """Anomaliler CSV veya JSON Lines olarak; /anomalies ile aynı filtreler"""
+    rows = export_service.export_anomalies(
+        format, donem_from=donem_from, donem_to=donem_to, name_prefix=name_prefix, category=category
+    )
+    return _export_response(rows, "anomaliler", format, donem_from, donem_to)
@@ -47,3 +47,11 @@ class AnomalyResponse(BaseModel):
     diff: Optional[float] = None
     categories: List[str]
     details: Optional[Dict[str, Any]] = None
+
+class PayrollRecordPage(BaseModel):
+    items: List[PayrollRecordResponse]
+    next_cursor: Optional[str] = None
+
+class AnomalyPage(BaseModel):
+    items: List[AnomalyResponse]
+    next_cursor: Optional[str] = None
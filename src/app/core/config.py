@@ -1,11 +1,45 @@
+from typing import Literal
+from pydantic import Field
 from pydantic_settings import BaseSettings
 import os
 import sys
 
+# Aykırı değer kuralının baktığı takvim ayı sayısı; RULE_OUTLIER_MIN_HISTORY bunu aşamaz
+OUTLIER_WINDOW = 6
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Maaş-Mesai Tespit"
     VERSION: str = "0.2.0"
     API_V1_STR: str = "/api/v1"
+    # PDF ayrıştırma işçi sayısı (0: CPU sayısı kadar)
+    PARSE_WORKERS: int = 0
+    # PDF tablo çıkarma motoru: "pdfplumber" (pdfminer) veya "pdfium" (pypdfium2, daha hızlı)
+    PDF_EXTRACTOR: str = "pdfplumber"
+    # Yeniden analiz edilen PDF'ler için ayrıştırma önbelleği
+    PARSE_CACHE_ENABLED: bool = True
+    PARSE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    # Bu boyuta kadar yüklemeler paylaşımlı bellekte, üstündekiler geçici dosyada tutulur
+    UPLOAD_SPOOL_THRESHOLD: int = 64 * 1024 * 1024
+    # Yüklemeler tek yazıcı görevde birleştirilerek yazılır; kuyruk doluysa yeni yüklemeler bekler
+    WRITE_QUEUE_SIZE: int = 16
+    # Birleştirilen yüklemelerin tek işlemde yazılacak en fazla satır sayısı
+    WRITE_GROUP_MAX_ROWS: int = 200_000
+    # Düşük bellek modu (çok büyük PDF'ler / az bellekli makineler): sonuçlar işçilerden sınırlı sayıda gelir,
+    # kayıtlar LOW_MEMORY_COMMIT_ROWS'luk partilerle yazılır, ayrıştırma önbelleği kullanılmaz
+    LOW_MEMORY_MODE: bool = False
+    LOW_MEMORY_COMMIT_ROWS: int = 20_000
+    # Düşük bellek modunda işçi başına bellek tavanı (MB, 0: sınırsız); aşılınca eşzamanlı sayfa işi azaltılır
+    WORKER_MEMORY_LIMIT_MB: int = 0
+    # Açıksa ?profile=1 ile gelen istek cProfile ile ölçülür ve PROFILE_DIR'e yazılır
+    PROFILE_REQUESTS: bool = False
+    # Anomali kuralı eşikleri; yükleme ve what-if isteklerinde sorgu parametresiyle değiştirilebilir
+    # (sınırlar rule_thresholds sorgu parametreleriyle aynıdır; hatalı ortam değişkeniyle uygulama açılmaz)
+    RULE_BALANCE_TOLERANCE: float = Field(10.0, ge=0)     # kazanç - (kesinti + ödeme) için izin verilen fark (TL)
+    RULE_INCREASE_LIMIT: float = Field(0.20, ge=0)        # önceki aya göre en fazla artış oranı
+    RULE_OVERTIME_LIMIT: float = Field(48.0, ge=0)        # aylık mesai saati sınırı
+    RULE_OUTLIER_K: float = Field(3.0, gt=0)              # geçmiş merkezinden en fazla k x yayılım
+    RULE_OUTLIER_MIN_HISTORY: int = Field(3, ge=1, le=OUTLIER_WINDOW)  # aykırı değer için gereken en az geçmiş ay
+    RULE_OUTLIER_METHOD: Literal["mad", "std"] = "mad"    # "mad": ortanca/MAD, "std": ortalama/standart sapma
     
     @property
     def BASE_DIR(self) -> str:
@@ -13,9 +47,21 @@ class Settings(BaseSettings):
             return os.path.dirname(sys.executable)
         return os.getcwd()
 
+    @property
+    def DATABASE_PATH(self) -> str:
+        return os.path.join(self.BASE_DIR, "data.db")
+
     @property
     def DATABASE_URL(self) -> str:
-        db_path = os.path.join(self.BASE_DIR, "data.db")
-        return f"sqlite+aiosqlite:///{db_path}"
+        return f"sqlite+aiosqlite:///{self.DATABASE_PATH}"
+
+    @property
+    def PARSE_CACHE_PATH(self) -> str:
+        # Oturum başında silinen data.db'den ayrı tutulur
+        return os.path.join(self.BASE_DIR, "parse_cache.db")
+
+    @property
+    def PROFILE_DIR(self) -> str:
+        return os.path.join(self.BASE_DIR, "profiles")
 
 settings = Settings()
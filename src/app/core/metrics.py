@@ -0,0 +1,147 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import bisect
+import threading
+import time
+
+# Aşama süreleri için kova sınırları (saniye)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PAGE_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Başlangıç süreleri bu modülün ilk yüklenmesinden itibaren ölçülür (MaasAnomali.py en başta yükler)
+PROCESS_START = time.perf_counter()
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        lines = []
+        cumulative = 0
+        sep = "," if labels else ""
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+class MetricsRegistry:
+    """Süreç içi sayaçlar ve histogramlar; Prometheus metin biçiminde yazılır"""
+
+    COUNTERS = {
+        "uploads_total": "İşlenen dosya sayısı",
+        "pages_parsed_total": "İşçilerde ayrıştırılan sayfa sayısı",
+        "rows_parsed_total": "PDF'lerden okunan bordro satırı sayısı",
+        "anomalies_detected_total": "Tespit edilen anomali sayısı",
+        "parse_cache_hits_total": "Ayrıştırma önbelleğinden dönen dosya sayısı",
+        "parse_cache_misses_total": "Önbellekte bulunamayan dosya sayısı",
+        "write_groups_total": "Yazıcının açtığı yazma işlemi sayısı",
+        "write_requests_total": "Yazıcıya gelen yükleme sayısı",
+        "write_failures_total": "Yazılamayan yükleme sayısı (gruptan ayrı denendikten sonra)",
+        "refresh_failures_total": "Arka planda yenilenemeyen dönem isteği sayısı",
+        "worker_memory_limit_hits_total": "İşçinin bellek tavanını aştığı sayfa parçası sayısı",
+    }
+
+    def __init__(self, prefix: str = "maas"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {name: 0 for name in self.COUNTERS}
+        self._stages: Dict[str, Histogram] = {}
+        self._pages = Histogram(PAGE_BUCKETS)
+        self.startup: Dict[str, float] = {}
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe_stage(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(STAGE_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_pages(self, page_seconds: Iterable[float]):
+        with self._lock:
+            for seconds in page_seconds:
+                self._pages.observe(seconds)
+                self._counters["pages_parsed_total"] += 1
+
+    def mark_startup(self, stage: str) -> float:
+        """Süreç başlangıcından bu aşamaya kadar geçen süre (yalnızca ilk işaret tutulur)"""
+        with self._lock:
+            return self.startup.setdefault(stage, time.perf_counter() - PROCESS_START)
+
+    def render(self) -> str:
+        p = self.prefix
+        lines = []
+        with self._lock:
+            for name, help_text in self.COUNTERS.items():
+                lines.append(f"# HELP {p}_{name} {help_text}")
+                lines.append(f"# TYPE {p}_{name} counter")
+                lines.append(f"{p}_{name} {self._counters[name]:g}")
+
+            lines.append(f"# HELP {p}_stage_duration_seconds İşlem aşaması süresi")
+            lines.append(f"# TYPE {p}_stage_duration_seconds histogram")
+            for stage in sorted(self._stages):
+                lines.extend(self._stages[stage].render(f"{p}_stage_duration_seconds", f'stage="{stage}"'))
+
+            lines.append(f"# HELP {p}_page_parse_seconds İşçi süreçte tek sayfanın ayrıştırma süresi")
+            lines.append(f"# TYPE {p}_page_parse_seconds histogram")
+            lines.extend(self._pages.render(f"{p}_page_parse_seconds"))
+
+            lines.append(f"# HELP {p}_startup_seconds Süreç başlangıcından aşamaya kadar geçen süre")
+            lines.append(f"# TYPE {p}_startup_seconds gauge")
+            for stage, seconds in self.startup.items():
+                lines.append(f'{p}_startup_seconds{{stage="{stage}"}} {seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# İstek başına aşama süreleri (Server-Timing başlığı için); istek dışında None
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+def start_request_timings() -> Dict[str, float]:
+    """Geçerli istek için boş süre tablosu açar; thread havuzu işleri de aynı tabloya yazar"""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+def _record(name: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+@contextmanager
+def stage(name: str):
+    """Bir aşamanın süresini histograma ve (varsa) istek süre tablosuna yazar"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe_stage(name, elapsed)
+        _record(name, elapsed)
+
+def record_pages(page_seconds: List[float], rows: int):
+    """İşçilerden dönen sayfa süreleri; istek tablosunda toplam işçi süresi olarak görünür"""
+    metrics.observe_pages(page_seconds)
+    metrics.inc("rows_parsed_total", rows)
+    _record("page_parse", sum(page_seconds))
+
+def server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
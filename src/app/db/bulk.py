@@ -0,0 +1,100 @@
+from typing import Any, Dict, Iterable, List, Optional, Set
+from src.app.db.models import PayrollAnomaly, PayrollRecord
+from src.app.services.anomaly_engine import VALUE_FIELDS
+from src.app.services.payroll_batch import PayrollBatch
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+
+# executemany başına satır sayısı
+BULK_BATCH_SIZE = 5000
+
+# (personel_ad, donem) dışında güncellenen sütunlar
+UPSERT_FIELDS = VALUE_FIELDS
+
+# Hata mesajında listelenen en fazla isim
+MAX_REPORTED_DUPLICATES = 5
+
+class DuplicateRecordError(ValueError):
+    """Aynı dosyada bir (personel_ad, donem) birden fazla kez geçiyor; upsert satırları sessizce birleştirirdi"""
+
+    def __init__(self, names: List[str], filename: Optional[str] = None):
+        # İşçi/yazıcı sınırlarında taşınabilmesi için tüm alanlar args içinde tutulur
+        super().__init__(names, filename)
+        self.names = names
+        self.filename = filename
+
+    def __str__(self) -> str:
+        shown = ", ".join(self.names[:MAX_REPORTED_DUPLICATES])
+        more = len(self.names) - MAX_REPORTED_DUPLICATES
+        if more > 0:
+            shown += f" (+{more})"
+        prefix = f"{self.filename}: " if self.filename else ""
+        return f"{prefix}Aynı dönemde birden fazla kaydı olan personel: {shown}"
+
+def record_values(record: PayrollRecord) -> Dict[str, Any]:
+    values = {"personel_ad": record.personel_ad, "donem": record.donem}
+    for field in UPSERT_FIELDS:
+        values[field] = getattr(record, field)
+    return values
+
+def _upsert_statement():
+    stmt = sqlite_insert(PayrollRecord.__table__)
+    # Aynı dönem yeniden yüklenirse satırlar çoğalmaz, yerinde güncellenir
+    return stmt.on_conflict_do_update(
+        index_elements=["personel_ad", "donem"],
+        set_={field: stmt.excluded[field] for field in UPSERT_FIELDS}
+    )
+
+async def upsert_rows(db: AsyncSession, rows: Iterable[Dict[str, Any]]) -> int:
+    """ORM iş birimi olmadan, büyük executemany partileriyle kayıt ekler/günceller (commit çağırana aittir)"""
+    stmt = _upsert_statement()
+    count = 0
+    batch: List[Dict[str, Any]] = []
+    # Çağrı içinde tekrar eden anahtar yazılmaz; işlem çağıranda geri alınır
+    keys = set()
+    for row in rows:
+        key = (row["personel_ad"], row["donem"])
+        if key in keys:
+            raise DuplicateRecordError([row["personel_ad"]])
+        keys.add(key)
+        batch.append(row)
+        if len(batch) >= BULK_BATCH_SIZE:
+            await db.execute(stmt, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        await db.execute(stmt, batch)
+        count += len(batch)
+    return count
+
+async def upsert_records(db: AsyncSession, records: Iterable[PayrollRecord]) -> int:
+    return await upsert_rows(db, (record_values(r) for r in records))
+
+async def upsert_batch(db: AsyncSession, batch: PayrollBatch) -> int:
+    """Ayrıştırıcı çıktısını ORM nesnesi üretmeden yazar"""
+    return await upsert_rows(db, batch.rows())
+
+async def delete_stale_rows(db: AsyncSession, period: date, keep: Set[str]) -> List[str]:
+    """Dönemin keep dışında kalan kayıtlarını ve anomalilerini siler (commit çağırana aittir); silinen isimler döner.
+
+    Yeniden yüklenen bir dönem böylece eski dosyadan kalan personel olmadan tümüyle yerine geçer.
+    """
+    result = await db.execute(
+        select(PayrollRecord.id, PayrollRecord.personel_ad).where(PayrollRecord.donem == period)
+    )
+    stale = [(record_id, name) for record_id, name in result if name not in keep]
+    if not stale:
+        return []
+    # Kimlik başına executemany: uzun IN listeleri SQLite değişken sınırına takılmaz
+    ids = [{"record_id": record_id} for record_id, _ in stale]
+    for start in range(0, len(ids), BULK_BATCH_SIZE):
+        chunk = ids[start:start + BULK_BATCH_SIZE]
+        await db.execute(
+            delete(PayrollAnomaly.__table__).where(PayrollAnomaly.__table__.c.record_id == bindparam("record_id")), chunk
+        )
+        await db.execute(
+            delete(PayrollRecord.__table__).where(PayrollRecord.__table__.c.id == bindparam("record_id")), chunk
+        )
+    return [name for _, name in stale]
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Float, String, Date
+from sqlalchemy import Float, String, Date, ForeignKey, JSON, Index
 from datetime import date
 
 class Base(DeclarativeBase):
@@ -7,6 +7,8 @@ class Base(DeclarativeBase):
 
 class PayrollRecord(Base):
     __tablename__ = "payroll_records"
+    # Önceki ay sorgusu, sayfalama ve upsert anahtarı: bir personelin dönem başına tek kaydı olur
+    __table_args__ = (Index("uq_payroll_records_personel_donem", "personel_ad", "donem", unique=True),)
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     personel_ad: Mapped[str] = mapped_column(String, index=True)
@@ -40,3 +42,17 @@ class PayrollRecord(Base):
     @property
     def toplam_odeme(self) -> float:
         return self.banka + self.kasa
+
+class PayrollAnomaly(Base):
+    """Kayıt anında hesaplanıp saklanan anomali sonuçları"""
+    __tablename__ = "payroll_anomalies"
+    __table_args__ = (Index("ix_payroll_anomalies_personel_donem", "personel_ad", "donem"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    record_id: Mapped[int] = mapped_column(ForeignKey("payroll_records.id", ondelete="CASCADE"), index=True)
+    personel_ad: Mapped[str] = mapped_column(String, index=True)
+    donem: Mapped[date] = mapped_column(Date, index=True)
+
+    issues: Mapped[list] = mapped_column(JSON, default=list)
+    categories: Mapped[list] = mapped_column(JSON, default=list)
+    details: Mapped[dict] = mapped_column(JSON, default=dict)
@@ -1,8 +1,36 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import event
 from src.app.core.config import settings
 from src.app.db.models import Base
+import os
 
 engine = create_async_engine(settings.DATABASE_URL, echo=False)
+# Okuma uçları ayrı bağlantılarla çalışır; WAL'da yazıcının işlemini beklemezler
+read_engine = create_async_engine(settings.DATABASE_URL, echo=False)
+
+# Bağlantı başına sayfa önbelleği (KiB); düşük bellek modunda her bağlantı için küçültülür
+CACHE_SIZE_KIB = 8192 if settings.LOW_MEMORY_MODE else 65536
+
+def configure_sqlite(dbapi_connection, connection_record):
+    """Toplu yüklemeler için SQLite ayarları"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # WAL ile NORMAL, her commit'te fsync yapmadan tutarlılığı korur
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    cursor.close()
+
+def configure_sqlite_reader(dbapi_connection, connection_record):
+    """Salt okunur bağlantı; günlük kipi yazıcı bağlantısında WAL'a alınır ve dosyada kalıcıdır"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    cursor.close()
+
+event.listen(engine.sync_engine, "connect", configure_sqlite)
+event.listen(read_engine.sync_engine, "connect", configure_sqlite_reader)
 
 SessionLocal = async_sessionmaker(
     autocommit=False, 
@@ -12,6 +40,33 @@ SessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+ReadSessionLocal = async_sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
+async def reset_database_file() -> bool:
+    """Oturum başında veritabanı dosyasını siler (satır silmekten hızlı); dosya kullanımdaysa False"""
+    await engine.dispose()
+    await read_engine.dispose()
+    # Önce WAL dosyaları: ana dosya kilitliyse bunlar da kilitlidir ve hiçbir şey silinmez
+    for suffix in ("-wal", "-shm", ""):
+        path = settings.DATABASE_PATH + suffix
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            return False
+    return True
+
 async def get_db():
     async with SessionLocal() as session:
         yield session
+
+async def get_read_db():
+    """Yalnızca okuyan uçlar için; yazmalar write_queue üzerinden yapılır"""
+    async with ReadSessionLocal() as session:
+        yield session
@@ -2,14 +2,20 @@ from fastapi import FastAPI
 from src.app.api.router import api_router
 from src.app.core.config import settings
 from src.app.db.models import Base
-from src.app.db.session import engine, SessionLocal
+from src.app.db.session import engine, SessionLocal, reset_database_file
+from src.app.services import worker_pool
+from src.app.core.metrics import metrics, PROMETHEUS_CONTENT_TYPE
 from fastapi.middleware.cors import CORSMiddleware
 
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi import Request
+from datetime import datetime
+import cProfile
+import re
+import threading
 import os
 import sys
-import webbrowser
 
 app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION)
 
@@ -25,31 +31,86 @@ static_path = get_static_path()
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
-if os.path.exists(static_path):
-    app.mount("/", StaticFiles(directory=static_path, html=True), name="static")
+_profile_lock = threading.Lock()
+
+async def profile_request(request: Request, call_next):
+    """?profile=1 ile gelen isteği cProfile ile ölçer.
+
+    Yalnızca olay döngüsünde çalışan kod ölçülür; thread havuzu ve işçi süreçlerdeki ayrıştırma
+    için Server-Timing ve /metrics kullanılır. Akış yanıtlarında gövde ölçüme girmez.
+    """
+    if request.query_params.get("profile") != "1" or not _profile_lock.acquire(blocking=False):
+        return await call_next(request)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_") or "root"
+        path = os.path.join(settings.PROFILE_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{request.method}_{name}.prof")
+        profiler.dump_stats(path)
+        response.headers["X-Profile-File"] = path
+        return response
+    finally:
+        _profile_lock.release()
+
+if settings.PROFILE_REQUESTS:
+    app.middleware("http")(profile_request)
+
+def create_missing_indexes(conn):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
 
 @app.on_event("startup")
 async def startup():
     from sqlalchemy import delete
-    from src.app.db.models import PayrollRecord
+    from src.app.db.models import PayrollRecord, PayrollAnomaly
+    from src.app.services.history_index import history_index
+    from src.app.services.summary_service import summary_cache
     
-    print("Veritabanı kontrol ediliyor...")
+    print("Yeni oturum için veritabanı sıfırlanıyor...")
+    # Dosyayı değiştirmek, büyümüş bir data.db'de satır silmekten çok daha hızlıdır
+    replaced = await reset_database_file()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    
-    print("Yeni oturum için veriler temizleniyor...")
-    async with SessionLocal() as db:
-        await db.execute(delete(PayrollRecord))
-        await db.commit()
+
+    if not replaced:
+        # Dosya başka bir süreçte açık: eski yöntemle satırlar silinir
+        async with SessionLocal() as db:
+            await db.execute(delete(PayrollAnomaly))
+            await db.execute(delete(PayrollRecord))
+            await db.commit()
+
+        # Eski sürümden kalan tablolara sonradan eklenen indeksler (tekil indeks boş tabloda kurulur)
+        async with engine.begin() as conn:
+            await conn.run_sync(create_missing_indexes)
+    history_index.clear()
+    summary_cache.clear()
     print("Veritabanı hazır ve boş.")
-    
-    # Auto open browser in local frozen mode
-    if getattr(sys, 'frozen', False) and not os.getenv("DEBUG"):
-        url = "http://127.0.0.1:8000"
-        print(f"Uygulama başlatıldı! Tarayıcı açılıyor: {url}")
-        print("Not: Tarayıcı otomatik açılmazsa yukarıdaki adresi kopyalayıp tarayıcınıza yapıştırın.")
-        webbrowser.open(url)
+    metrics.mark_startup("db_ready")
+    # PDF modülleri ve işçiler burada ısıtılmaz: bu kanca soket açılmadan çalışır.
+    # MaasAnomali.py sunucu dinlemeye başlayınca worker_pool.start_prewarm() çağırır;
+    # doğrudan uvicorn ile çalıştırıldığında havuz ilk ayrıştırmada kurulur.
+
+@app.on_event("shutdown")
+async def shutdown():
+    from src.app.services.write_queue import write_queue
+    # Kuyruktaki yüklemeler kaydedilmeden kapanılmaz
+    await write_queue.stop()
+    worker_pool.shutdown_pool()
 
 @app.get("/healthz")
 def healthz():
     return {"status": "ok"}
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+# Kök dizine bağlanan arayüz en sona eklenir; aksi halde /healthz ve /metrics yollarını gölgeler
+if os.path.exists(static_path):
+    app.mount("/", StaticFiles(directory=static_path, html=True), name="static")
@@ -0,0 +1,268 @@
+from typing import List, Dict, Any, NamedTuple, Tuple, Optional, Sequence
+from src.app.db.models import PayrollRecord
+from src.app.core.config import OUTLIER_WINDOW, settings
+from datetime import date, timedelta
+import numpy as np
+import warnings
+
+# Sayısal sütunlar (PayrollRecord ile aynı sırada)
+VALUE_FIELDS = (
+    "maas", "mesai", "mesai_saati", "ek", "yardim",
+    "bes", "avans", "icra", "borc",
+    "banka", "kasa",
+)
+
+# Çok aylı geçmişe göre aykırı değer kuralı (eşikler Settings'te)
+HISTORY_METRICS = ("kazanc", "kesinti", "mesai_saati")
+OUTLIER_METHODS = ("mad", "std")
+# Sabit geçmişte her küçük değişiklik işaretlenmesin diye yayılımın alt sınırları
+OUTLIER_REL_FLOOR = 0.05
+OUTLIER_ABS_FLOOR = {"kazanc": 100.0, "kesinti": 100.0, "mesai_saati": 4.0}
+# Normal dağılımda MAD'i standart sapmaya çevirir
+MAD_SCALE = 1.4826
+
+TotalsIndex = Dict[Tuple[str, date], float]
+
+class RuleThresholds(NamedTuple):
+    """Kural eşikleri; verilmeyen alanlar Settings'ten gelir"""
+    balance_tolerance: float
+    increase_limit: float
+    overtime_limit: float
+    outlier_k: float
+    outlier_min_history: int
+    outlier_method: str
+
+    @classmethod
+    def from_settings(cls, **overrides: Any) -> "RuleThresholds":
+        values = {
+            "balance_tolerance": settings.RULE_BALANCE_TOLERANCE,
+            "increase_limit": settings.RULE_INCREASE_LIMIT,
+            "overtime_limit": settings.RULE_OVERTIME_LIMIT,
+            "outlier_k": settings.RULE_OUTLIER_K,
+            "outlier_min_history": settings.RULE_OUTLIER_MIN_HISTORY,
+            "outlier_method": settings.RULE_OUTLIER_METHOD,
+        }
+        values.update((key, value) for key, value in overrides.items() if value is not None)
+        return cls(**values)
+
+def month_index(donem: date) -> int:
+    return donem.year * 12 + donem.month - 1
+
+def previous_period(donem: date) -> date:
+    """Bir önceki dönemin ilk günü"""
+    prev_month_date = donem - timedelta(days=5)
+    return prev_month_date.replace(day=1)
+
+class PayrollColumns:
+    """Bordro satırlarının sütun bazlı (NumPy) görünümü"""
+
+    def __init__(self, names: List[str], donem: List[date], columns: Dict[str, np.ndarray]):
+        self.names = names
+        self.donem = donem
+        self.columns = columns
+        self._totals: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.columns[field]
+
+    @classmethod
+    def from_records(cls, records: Sequence[PayrollRecord]) -> "PayrollColumns":
+        columns = {
+            field: np.fromiter((getattr(r, field) for r in records), dtype=np.float64, count=len(records))
+            for field in VALUE_FIELDS
+        }
+        return cls([r.personel_ad for r in records], [r.donem for r in records], columns)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]]) -> "PayrollColumns":
+        """(personel_ad, donem, *VALUE_FIELDS) sıralı satırlardan (ör. Core select sonucu)"""
+        names = [row[0] for row in rows]
+        donem = [row[1] for row in rows]
+        if rows:
+            matrix = np.array([row[2:] for row in rows], dtype=np.float64)
+        else:
+            matrix = np.empty((0, len(VALUE_FIELDS)), dtype=np.float64)
+        columns = {field: matrix[:, i].copy() for i, field in enumerate(VALUE_FIELDS)}
+        return cls(names, donem, columns)
+
+    @classmethod
+    def from_parse_result(cls, rows: Sequence[Dict[str, Any]], period: date) -> "PayrollColumns":
+        """process_page_chunk çıktısındaki sözlüklerden, tek dönem için"""
+        columns = {
+            field: np.fromiter((row[field] for row in rows), dtype=np.float64, count=len(rows))
+            for field in VALUE_FIELDS
+        }
+        return cls([row["personel_ad"] for row in rows], [period] * len(rows), columns)
+
+    def totals(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(toplam_kazanc, toplam_kesinti, toplam_odeme) dizileri"""
+        if self._totals is None:
+            c = self.columns
+            kazanc = c["maas"] + c["mesai"] + c["ek"] + c["yardim"]
+            kesinti = c["bes"] + c["avans"] + c["icra"] + c["borc"]
+            odeme = c["banka"] + c["kasa"]
+            self._totals = (kazanc, kesinti, odeme)
+        return self._totals
+
+    def history_values(self) -> np.ndarray:
+        """HISTORY_METRICS sırasıyla (metrik, satır) dizisi"""
+        kazanc, kesinti, _ = self.totals()
+        return np.stack([kazanc, kesinti, self.columns["mesai_saati"]])
+
+    def totals_index(self) -> TotalsIndex:
+        """(personel_ad, donem) -> toplam kazanç; tekrar eden anahtarlarda ilk satır"""
+        index: TotalsIndex = {}
+        kazanc = self.totals()[0].tolist()
+        for key, total in zip(zip(self.names, self.donem), kazanc):
+            index.setdefault(key, total)
+        return index
+
+    def previous_totals(self, index: TotalsIndex) -> np.ndarray:
+        """Her satır için önceki dönem toplam kazancı (yoksa NaN)"""
+        prev_dates = {d: previous_period(d) for d in set(self.donem)}
+        nan = float("nan")
+        return np.fromiter(
+            (index.get((name, prev_dates[d]), nan) for name, d in zip(self.names, self.donem)),
+            dtype=np.float64, count=len(self),
+        )
+
+class OutlierResult:
+    """Geçmiş penceresine göre aykırı değer sonucu; diziler (metrik, satır) şeklinde"""
+
+    def __init__(self, flags: np.ndarray, values: np.ndarray, center: np.ndarray, spread: np.ndarray, window: int):
+        self.flags = flags
+        self.values = values
+        self.center = center
+        self.spread = spread
+        self.window = window
+
+def history_stats(history: np.ndarray, method: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(merkez, alt sınırlı yayılım, dolu ay sayısı); history'nin ilk ekseni metrik, son ekseni aylar"""
+    count = np.sum(~np.isnan(history), axis=-1)
+    with warnings.catch_warnings():
+        # Geçmişi olmayan satırlarda tümü NaN dilimler beklenir
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if method == "std":
+            center = np.nanmean(history, axis=-1)
+            spread = np.nanstd(history, axis=-1)
+        else:
+            center = np.nanmedian(history, axis=-1)
+            spread = MAD_SCALE * np.nanmedian(np.abs(history - center[..., None]), axis=-1)
+
+    floors = np.array([OUTLIER_ABS_FLOOR[m] for m in HISTORY_METRICS]).reshape((-1,) + (1,) * (center.ndim - 1))
+    spread = np.maximum(spread, np.maximum(OUTLIER_REL_FLOOR * np.abs(center), floors))
+    return center, spread, count
+
+def history_outliers(
+    cols: PayrollColumns,
+    history: np.ndarray,
+    thresholds: Optional[RuleThresholds] = None,
+) -> OutlierResult:
+    """history: HistoryIndex.window çıktısı, (metrik, satır, ay); eksik aylar NaN"""
+    t = thresholds or RuleThresholds.from_settings()
+    values = cols.history_values()
+    center, spread, count = history_stats(history, t.outlier_method)
+    with np.errstate(invalid="ignore"):
+        flags = (count >= t.outlier_min_history) & (np.abs(values - center) > t.outlier_k * spread)
+    return OutlierResult(flags, values, center, spread, history.shape[2])
+
+OUTLIER_ISSUES = {
+    "kazanc": ("maaş", "Maaş sorunu: Son {window} aya göre olağan dışı kazanç ({value:.2f} TL, beklenen {center:.2f} TL)"),
+    "kesinti": ("maaş", "Maaş sorunu: Son {window} aya göre olağan dışı kesinti ({value:.2f} TL, beklenen {center:.2f} TL)"),
+    "mesai_saati": ("mesai", "Mesai sorunu: Son {window} aya göre olağan dışı mesai ({value:g} saat, beklenen {center:.1f} saat)"),
+}
+
+def evaluate(
+    cols: PayrollColumns, prev_totals: np.ndarray, outliers: Optional[OutlierResult] = None,
+    thresholds: Optional[RuleThresholds] = None
+) -> List[Dict[str, Any]]:
+    """Kuralları tüm dizi üzerinde uygular, sadece hatalı satırlar için sözlük üretir"""
+    return [anomaly for _, anomaly in evaluate_rows(cols, prev_totals, outliers, thresholds)]
+
+def evaluate_rows(
+    cols: PayrollColumns, prev_totals: np.ndarray, outliers: Optional[OutlierResult] = None,
+    thresholds: Optional[RuleThresholds] = None
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """evaluate ile aynı, her anomali satır numarasıyla birlikte döner"""
+    t = thresholds or RuleThresholds.from_settings()
+    kazanc, kesinti, odeme = cols.totals()
+
+    # Maaş Dengesi (Eski Kural 1)
+    diff = kazanc - (kesinti + odeme)
+    fail_r1 = ~(np.abs(diff) <= t.balance_tolerance)
+
+    # Maaş Artışı (Eski Kural 2)
+    has_prev = prev_totals > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        increase = np.where(has_prev, (kazanc - prev_totals) / prev_totals, 0.0)
+    fail_r2 = has_prev & (increase > t.increase_limit)
+
+    # Mesai Sınırı (Eski Kural 3)
+    saat = cols["mesai_saati"]
+    fail_r3 = ~(saat <= t.overtime_limit)
+
+    failed = fail_r1 | fail_r2 | fail_r3
+    # Çok aylı geçmişe göre aykırı değer (Kural 4)
+    if outliers is not None:
+        fail_r4 = outliers.flags.any(axis=0)
+        failed = failed | fail_r4
+
+    anomalies = []
+    columns = {field: cols[field].tolist() for field in VALUE_FIELDS}
+    for i in np.flatnonzero(failed).tolist():
+        issues = []
+        categories = []
+        rule_details = {}
+
+        if fail_r1[i]:
+            issues.append(f"Maaş sorunu: Ödeme dengesizliği (Fark: {float(diff[i]):.2f} TL)")
+            categories.append("maaş")
+
+        if fail_r2[i]:
+            increase_pct = float(increase[i]) * 100
+            issues.append(f"Maaş sorunu: %{increase_pct:.1f} yüksek artış tespit edildi.")
+            if "maaş" not in categories:
+                categories.append("maaş")
+            rule_details["salary_increase"] = {
+                "prev_total": float(prev_totals[i]),
+                "current_total": float(kazanc[i]),
+                "increase_pct": increase_pct
+            }
+
+        if fail_r3[i]:
+            issues.append(f"Mesai sorunu: Aylık mesai sınırı aşıldı ({columns['mesai_saati'][i]} saat)")
+            categories.append("mesai")
+
+        if outliers is not None and fail_r4[i]:
+            history_details = {}
+            for m, metric in enumerate(HISTORY_METRICS):
+                if not outliers.flags[m, i]:
+                    continue
+                category, template = OUTLIER_ISSUES[metric]
+                value = float(outliers.values[m, i])
+                center = float(outliers.center[m, i])
+                issues.append(template.format(window=outliers.window, value=value, center=center))
+                if category not in categories:
+                    categories.append(category)
+                history_details[metric] = {
+                    "value": value,
+                    "center": center,
+                    "spread": float(outliers.spread[m, i]),
+                    "months": outliers.window
+                }
+            rule_details["history_outliers"] = history_details
+
+        anomaly = {
+            "personel_ad": cols.names[i],
+            "donem": cols.donem[i].strftime("%Y-%m"),
+        }
+        for field in VALUE_FIELDS:
+            anomaly[field] = columns[field][i]
+        anomaly["issues"] = issues
+        anomaly["details"] = rule_details
+        anomaly["categories"] = categories
+        anomalies.append((i, anomaly))
+    return anomalies
@@ -1,42 +1,87 @@
-from typing import List, Dict, Any, Tuple
-from src.app.db.models import PayrollRecord
+from typing import List, Dict, Any, Tuple, Optional, Iterable
+from src.app.core.config import settings
+from src.app.db.models import PayrollRecord, PayrollAnomaly
+from src.app.db.bulk import BULK_BATCH_SIZE
+from src.app.services.anomaly_engine import (
+    OUTLIER_WINDOW, PayrollColumns, RuleThresholds, TotalsIndex, VALUE_FIELDS,
+    evaluate_rows, history_outliers, month_index, previous_period
+)
+from src.app.services.history_index import HistoryIndex, history_index
+from src.app.services.payroll_batch import PayrollBatch
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from datetime import date, timedelta
+from src.app.services.pagination import Cursor, like_prefix, split_page
+from sqlalchemy import Select, select, and_, tuple_, delete, insert, func
+from starlette.concurrency import run_in_threadpool
+from datetime import date
+import numpy as np
+
+# SQLite varsayılan olarak sorgu başına 999 parametreye izin verir
+LOOKUP_BATCH_SIZE = 400
+
+def detect_rows(
+    cols: PayrollColumns, prev_totals: np.ndarray, window: np.ndarray, thresholds: Optional[RuleThresholds] = None
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """Paylaşılan duruma dokunmayan kural hesabı; olay döngüsünü tutmamak için thread havuzunda çalışır"""
+    return evaluate_rows(cols, prev_totals, history_outliers(cols, window, thresholds), thresholds)
 
 class AnomalyService:
     @staticmethod
-    def check_rule_1(record: PayrollRecord) -> Tuple[bool, float]:
+    def check_rule_1(record: PayrollRecord, thresholds: Optional[RuleThresholds] = None) -> Tuple[bool, float]:
         """Kazanç = Kesinti + Ödeme (Denklik Kontrolü)"""
+        t = thresholds or RuleThresholds.from_settings()
         kazanc = record.maas + record.mesai + record.ek + record.yardim
         kesinti = record.bes + record.avans + record.icra + record.borc
         odeme = record.banka + record.kasa
         
         diff = kazanc - (kesinti + odeme)
-        return abs(diff) <= 10.0, diff
+        return abs(diff) <= t.balance_tolerance, diff
 
     @staticmethod
-    async def check_rule_2(db: AsyncSession, record: PayrollRecord) -> Tuple[bool, Dict[str, Any]]:
-        """%20'den fazla ücret artışı kontrolü"""
-        prev_month_date = record.donem - timedelta(days=5)
-        prev_month_date = prev_month_date.replace(day=1)
-        
-        query = select(PayrollRecord).where(
-            and_(
-                PayrollRecord.personel_ad == record.personel_ad,
-                PayrollRecord.donem == prev_month_date
-            )
-        )
-        result = await db.execute(query)
-        prev_record = result.scalars().first()
-        
+    async def load_previous_totals(db: AsyncSession, cols: PayrollColumns) -> TotalsIndex:
+        """Önceki dönem toplam kazançlarını toplu sorgularla yükler"""
+        # personel_ad NOT NULL olduğundan isimsiz satırların önceki kaydı olamaz
+        keys = {
+            (name, previous_period(d)) for name, d in zip(cols.names, cols.donem) if name is not None
+        }
+        key_list = list(keys)
+        index: TotalsIndex = {}
+        if len(key_list) > LOOKUP_BATCH_SIZE:
+            # Büyük partilerde önceki dönemler tek sorguyla (donem indeksiyle) okunur; yüzlerce IN sorgusundan hızlıdır
+            query = select(
+                PayrollRecord.personel_ad, PayrollRecord.donem,
+                PayrollRecord.maas, PayrollRecord.mesai, PayrollRecord.ek, PayrollRecord.yardim
+            ).where(PayrollRecord.donem.in_({d for _, d in keys})).order_by(PayrollRecord.id)
+            for name, donem, maas, mesai, ek, yardim in await db.execute(query):
+                if (name, donem) in keys:
+                    index.setdefault((name, donem), maas + mesai + ek + yardim)
+            return index
+        for i in range(0, len(key_list), LOOKUP_BATCH_SIZE):
+            batch = key_list[i:i + LOOKUP_BATCH_SIZE]
+            query = select(
+                PayrollRecord.personel_ad, PayrollRecord.donem,
+                PayrollRecord.maas, PayrollRecord.mesai, PayrollRecord.ek, PayrollRecord.yardim
+            ).where(
+                tuple_(PayrollRecord.personel_ad, PayrollRecord.donem).in_(batch)
+            ).order_by(PayrollRecord.id)
+            result = await db.execute(query)
+            for name, donem, maas, mesai, ek, yardim in result:
+                # Tekil sorgudaki .first() davranışı: ilk eşleşen kayıt
+                index.setdefault((name, donem), maas + mesai + ek + yardim)
+        return index
+
+    @staticmethod
+    def evaluate_rule_2(
+        record: PayrollRecord, prev_record: Optional[PayrollRecord], thresholds: Optional[RuleThresholds] = None
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Artış sınırını (varsayılan %20) aşan ücret artışı kontrolü (önceki kayıt verilmiş halde)"""
+        t = thresholds or RuleThresholds.from_settings()
         current_total = record.maas + record.mesai + record.ek + record.yardim
         
         if prev_record:
             prev_total = prev_record.maas + prev_record.mesai + prev_record.ek + prev_record.yardim
             if prev_total > 0:
                 increase = (current_total - prev_total) / prev_total
-                if increase > 0.20:
+                if increase > t.increase_limit:
                     return False, {
                         "prev_total": prev_total,
                         "current_total": current_total,
@@ -44,54 +89,177 @@ class AnomalyService:
                     }
         return True, {}
 
+    @classmethod
+    async def check_rule_2(
+        cls, db: AsyncSession, record: PayrollRecord, thresholds: Optional[RuleThresholds] = None
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Artış sınırını aşan ücret artışı kontrolü"""
+        query = select(PayrollRecord).where(
+            and_(
+                PayrollRecord.personel_ad == record.personel_ad,
+                PayrollRecord.donem == previous_period(record.donem)
+            )
+        )
+        result = await db.execute(query)
+        return cls.evaluate_rule_2(record, result.scalars().first(), thresholds)
+
     @staticmethod
-    def check_rule_3(record: PayrollRecord) -> bool:
-        """48 saatten fazla mesai kontrolü"""
-        return record.mesai_saati <= 48.0
+    def check_rule_3(record: PayrollRecord, thresholds: Optional[RuleThresholds] = None) -> bool:
+        """Aylık mesai sınırı (varsayılan 48 saat) kontrolü"""
+        t = thresholds or RuleThresholds.from_settings()
+        return record.mesai_saati <= t.overtime_limit
 
     @classmethod
-    async def get_anomalies(cls, db: AsyncSession, records: List[PayrollRecord]) -> List[Dict[str, Any]]:
-        anomalies = []
-        for rec in records:
-            issues = []
-            categories = set()
-            rule_details = {}
-            
-            # Maaş Dengesi (Eski Kural 1)
-            is_valid_r1, diff = cls.check_rule_1(rec)
-            if not is_valid_r1:
-                issues.append(f"Maaş sorunu: Ödeme dengesizliği (Fark: {diff:.2f} TL)")
-                categories.add("maaş")
-            
-            # Maaş Artışı (Eski Kural 2)
-            is_valid_r2, r2_data = await cls.check_rule_2(db, rec)
-            if not is_valid_r2:
-                issues.append(f"Maaş sorunu: %{r2_data['increase_pct']:.1f} yüksek artış tespit edildi.")
-                categories.add("maaş")
-                rule_details["salary_increase"] = r2_data
-            
-            # Mesai Sınırı (Eski Kural 3)
-            if not cls.check_rule_3(rec):
-                issues.append(f"Mesai sorunu: Aylık mesai sınırı aşıldı ({rec.mesai_saati} saat)")
-                categories.add("mesai")
-            
-            if issues:
-                anomalies.append({
-                    "personel_ad": rec.personel_ad,
-                    "donem": rec.donem.strftime("%Y-%m"),
-                    "maas": rec.maas,
-                    "mesai": rec.mesai,
-                    "mesai_saati": rec.mesai_saati,
-                    "ek": rec.ek,
-                    "yardim": rec.yardim,
-                    "bes": rec.bes,
-                    "avans": rec.avans,
-                    "icra": rec.icra,
-                    "borc": rec.borc,
-                    "banka": rec.banka,
-                    "kasa": rec.kasa,
-                    "issues": issues,
-                    "details": rule_details,
-                    "categories": list(categories)
-                })
-        return anomalies
+    async def get_anomalies(
+        cls, db: AsyncSession, batch: PayrollBatch, thresholds: Optional[RuleThresholds] = None
+    ) -> List[Dict[str, Any]]:
+        return await cls.get_anomalies_for_columns(db, batch.to_columns(), thresholds)
+
+    @classmethod
+    async def get_anomalies_for_columns(
+        cls, db: AsyncSession, cols: PayrollColumns, thresholds: Optional[RuleThresholds] = None,
+        pending_totals: Optional[TotalsIndex] = None, pending_history: Optional[HistoryIndex] = None
+    ) -> List[Dict[str, Any]]:
+        """Henüz kaydedilmemiş bir parti için; önceki dönemler veritabanından, varsa pending_totals/pending_history'den okunur"""
+        prev_index = await cls.load_previous_totals(db, cols)
+        if pending_totals:
+            # Aynı istekte daha önce değerlendirilen (kuyruğa girecek) dönemler veritabanındakinden yenidir
+            prev_index.update(pending_totals)
+        await history_index.ensure_loaded(db)
+        # Geçmiş penceresi dizinden burada (olay döngüsünde) kopyalanır
+        window = history_index.window(cols, OUTLIER_WINDOW)
+        if pending_history is not None:
+            pending = pending_history.window(cols, OUTLIER_WINDOW)
+            window = np.where(np.isnan(pending), window, pending)
+        rows = await run_in_threadpool(
+            detect_rows, cols, cols.previous_totals(prev_index), window, thresholds
+        )
+        return [anomaly for _, anomaly in rows]
+
+    @classmethod
+    async def refresh_materialized(cls, db: AsyncSession, periods: Iterable[date]) -> List[date]:
+        """Yeni gelen dönemlerin ve geçmiş penceresinde bu dönemleri gören sonraki ayların anomalilerini yeniden yazar.
+
+        Kayıtlar aynı oturumda henüz commit edilmemiş olabilir; commit ve ardından değişen dönemlerin
+        (dönen liste) özet önbelleğinden düşülmesi çağırana aittir.
+        """
+        new_periods = set(periods)
+        new_months = {month_index(d) for d in new_periods}
+        result = await db.execute(select(PayrollRecord.donem).distinct())
+        # Artış kuralı bir önceki aya, aykırı değer kuralı son OUTLIER_WINDOW aya bakar
+        affected = [
+            d for d in result.scalars()
+            if d in new_periods or previous_period(d) in new_periods
+            or any(0 < month_index(d) - m <= OUTLIER_WINDOW for m in new_months)
+        ]
+        if not affected:
+            return affected
+
+        await db.execute(delete(PayrollAnomaly).where(PayrollAnomaly.donem.in_(affected)))
+
+        query = select(
+            PayrollRecord.id, PayrollRecord.personel_ad, PayrollRecord.donem,
+            *(getattr(PayrollRecord, field) for field in VALUE_FIELDS)
+        ).order_by(PayrollRecord.id)
+        # Kaydedilen anomaliler Settings eşikleriyle hesaplanır; istek bazlı eşikler yalnızca yanıtı etkiler
+        await history_index.ensure_loaded(db)
+        if settings.LOW_MEMORY_MODE:
+            # Dönemler belleğe tümüyle alınmaz: önce geçmiş dizini yeni dönemlerle güncellenir,
+            # ardından satırlar LOW_MEMORY_COMMIT_ROWS'luk parçalarla değerlendirilir
+            result = await db.stream(
+                query.where(PayrollRecord.donem.in_(new_periods)).execution_options(yield_per=BULK_BATCH_SIZE)
+            )
+            async for partition in result.partitions():
+                history_index.update(PayrollColumns.from_rows([row[1:] for row in partition]))
+            result = await db.stream(
+                query.where(PayrollRecord.donem.in_(affected)).execution_options(yield_per=settings.LOW_MEMORY_COMMIT_ROWS)
+            )
+            async for partition in result.partitions():
+                await cls._materialize_rows(db, partition)
+        else:
+            # Parça parça okunur; tek yazıcı bu sırada olay döngüsünü (okuma isteklerini) uzun süre tutmaz
+            rows = []
+            result = await db.stream(query.where(PayrollRecord.donem.in_(affected)).execution_options(yield_per=BULK_BATCH_SIZE))
+            async for partition in result.partitions():
+                rows.extend(partition)
+            # Geçmiş dizini yeni dönemlerin kaydedilmiş haliyle güncellenir
+            history_index.update(PayrollColumns.from_rows([row[1:] for row in rows if row[2] in new_periods]))
+            await cls._materialize_rows(db, rows)
+        return affected
+
+    @classmethod
+    async def _materialize_rows(cls, db: AsyncSession, rows: List[Any]):
+        """(id, personel_ad, donem, değerler...) satırlarının anomalilerini tabloya ekler; geçmiş dizini güncel olmalıdır"""
+        cols = PayrollColumns.from_rows([row[1:] for row in rows])
+        prev_index = await cls.load_previous_totals(db, cols)
+        flagged = await run_in_threadpool(
+            detect_rows, cols, cols.previous_totals(prev_index), history_index.window(cols, OUTLIER_WINDOW)
+        )
+
+        values = [
+            {
+                "record_id": rows[i][0],
+                "personel_ad": cols.names[i],
+                "donem": cols.donem[i],
+                "issues": anomaly["issues"],
+                "categories": anomaly["categories"],
+                "details": anomaly["details"]
+            }
+            for i, anomaly in flagged
+        ]
+        # ORM toplu eklemesi yerine tablo üzerinden, BULK_BATCH_SIZE'lık executemany partileriyle
+        for start in range(0, len(values), BULK_BATCH_SIZE):
+            await db.execute(insert(PayrollAnomaly.__table__), values[start:start + BULK_BATCH_SIZE])
+
+    @staticmethod
+    async def list_anomalies(
+        db: AsyncSession,
+        limit: int,
+        after: Optional[Cursor] = None,
+        donem_from: Optional[date] = None,
+        donem_to: Optional[date] = None,
+        name_prefix: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """(personel_ad, donem, id) anahtarıyla sayfalanmış, filtreleri SQL'de uygulanmış anomaliler"""
+        query = select(
+            PayrollRecord.personel_ad, PayrollRecord.donem,
+            *(getattr(PayrollRecord, field) for field in VALUE_FIELDS),
+            PayrollAnomaly.id,
+            PayrollAnomaly.issues, PayrollAnomaly.details, PayrollAnomaly.categories
+        ).join(PayrollRecord, PayrollAnomaly.record_id == PayrollRecord.id)
+
+        if after is not None:
+            query = query.where(tuple_(PayrollAnomaly.personel_ad, PayrollAnomaly.donem, PayrollAnomaly.id) > after)
+        query = filter_anomalies(query, donem_from, donem_to, name_prefix, category)
+
+        query = query.order_by(PayrollAnomaly.personel_ad, PayrollAnomaly.donem, PayrollAnomaly.id).limit(limit + 1)
+        rows, cursor = split_page((await db.execute(query)).all(), limit, lambda row: (row[0], row[1], row[-4]))
+        return [anomaly_from_row(row) for row in rows], cursor
+
+def filter_anomalies(
+    query: Select,
+    donem_from: Optional[date] = None,
+    donem_to: Optional[date] = None,
+    name_prefix: Optional[str] = None,
+    category: Optional[str] = None
+) -> Select:
+    """Liste ve dışa aktarma uçlarının ortak filtreleri (SQL'de uygulanır)"""
+    if donem_from is not None:
+        query = query.where(PayrollAnomaly.donem >= donem_from)
+    if donem_to is not None:
+        query = query.where(PayrollAnomaly.donem <= donem_to)
+    if name_prefix:
+        query = query.where(PayrollAnomaly.personel_ad.like(like_prefix(name_prefix), escape="\\"))
+    if category:
+        values = func.json_each(PayrollAnomaly.categories).table_valued("value")
+        query = query.where(select(1).select_from(values).where(values.c.value == category).exists())
+    return query
+
+def anomaly_from_row(row) -> Dict[str, Any]:
+    """(personel_ad, donem, *VALUE_FIELDS, issues, details, categories) satırından yanıt sözlüğü"""
+    anomaly = {"personel_ad": row[0], "donem": row[1].strftime("%Y-%m")}
+    for i, field in enumerate(VALUE_FIELDS, start=2):
+        anomaly[field] = row[i]
+    anomaly["issues"], anomaly["details"], anomaly["categories"] = row[-3:]
+    return anomaly
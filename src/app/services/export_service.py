@@ -0,0 +1,122 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from src.app.db.models import PayrollRecord, PayrollAnomaly
+from src.app.db.session import ReadSessionLocal
+from src.app.services.anomaly_engine import VALUE_FIELDS
+from src.app.services.anomaly_service import anomaly_from_row, filter_anomalies
+from src.app.services.pagination import like_prefix
+from sqlalchemy import Select, select
+from datetime import date
+import csv
+import io
+import json
+
+# Veritabanından parça parça çekilen satır sayısı; bellek kullanımı buna bağlıdır, toplam satıra değil
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+}
+
+RECORD_COLUMNS = ("personel_ad", "donem") + VALUE_FIELDS + ("toplam_kazanc", "toplam_kesinti", "toplam_odeme")
+ANOMALY_COLUMNS = ("personel_ad", "donem") + VALUE_FIELDS + ("categories", "issues", "details")
+
+def record_query(
+    donem_from: Optional[date] = None,
+    donem_to: Optional[date] = None,
+    name_prefix: Optional[str] = None
+) -> Select:
+    # id sırası: büyük dışa aktarmalarda SQLite geçici sıralama tablosu kurmaz
+    query = select(
+        PayrollRecord.personel_ad, PayrollRecord.donem,
+        *(getattr(PayrollRecord, field) for field in VALUE_FIELDS)
+    ).order_by(PayrollRecord.id)
+    if donem_from is not None:
+        query = query.where(PayrollRecord.donem >= donem_from)
+    if donem_to is not None:
+        query = query.where(PayrollRecord.donem <= donem_to)
+    if name_prefix:
+        query = query.where(PayrollRecord.personel_ad.like(like_prefix(name_prefix), escape="\\"))
+    return query
+
+def anomaly_query(
+    donem_from: Optional[date] = None,
+    donem_to: Optional[date] = None,
+    name_prefix: Optional[str] = None,
+    category: Optional[str] = None
+) -> Select:
+    query = select(
+        PayrollRecord.personel_ad, PayrollRecord.donem,
+        *(getattr(PayrollRecord, field) for field in VALUE_FIELDS),
+        PayrollAnomaly.issues, PayrollAnomaly.details, PayrollAnomaly.categories
+    ).join(PayrollRecord, PayrollAnomaly.record_id == PayrollRecord.id).order_by(PayrollAnomaly.id)
+    return filter_anomalies(query, donem_from, donem_to, name_prefix, category)
+
+def record_from_row(row) -> Dict[str, Any]:
+    record = {"personel_ad": row[0], "donem": row[1].isoformat()}
+    for i, field in enumerate(VALUE_FIELDS, start=2):
+        record[field] = row[i]
+    record["toplam_kazanc"], record["toplam_kesinti"], record["toplam_odeme"] = _totals(row)
+    return record
+
+def _totals(row) -> Tuple[float, float, float]:
+    # (personel_ad, donem, *VALUE_FIELDS) satırında sütun sırası sabittir
+    _, _, maas, mesai, _, ek, yardim, bes, avans, icra, borc, banka, kasa = row[:13]
+    return maas + mesai + ek + yardim, bes + avans + icra + borc, banka + kasa
+
+def record_csv_row(row) -> List[Any]:
+    return [row[0], row[1].isoformat(), *row[2:13], *_totals(row)]
+
+def anomaly_csv_row(row) -> List[Any]:
+    """Liste/sözlük alanları tek hücreye sığdırılır"""
+    issues, details, categories = row[-3:]
+    return [
+        row[0], row[1].strftime("%Y-%m"), *row[2:-3],
+        " | ".join(categories), " | ".join(issues), json.dumps(details, ensure_ascii=False)
+    ]
+
+async def _fetch_batches(query: Select) -> AsyncIterator[Sequence[Any]]:
+    # Yanıt akarken istek bağımlılıkları kapanmış olabilir, oturum burada açılır
+    async with ReadSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield rows
+
+async def export_rows(
+    query: Select,
+    columns: Sequence[str],
+    to_csv: Callable[[Any], List[Any]],
+    to_dict: Callable[[Any], Dict[str, Any]],
+    fmt: str
+) -> AsyncIterator[str]:
+    """Sorgu sonucunu parça başına tek metin bloğu olarak CSV veya JSON Lines biçiminde üretir"""
+    buffer = io.StringIO()
+    if fmt == "csv":
+        # BOM: Excel Türkçe karakterleri doğru açsın
+        buffer.write("\ufeff")
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+
+    async for rows in _fetch_batches(query):
+        if fmt == "csv":
+            writer.writerows(map(to_csv, rows))
+        else:
+            buffer.writelines(json.dumps(to_dict(row), ensure_ascii=False) + "\n" for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Boş sonuçta yalnızca başlık satırı
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_records(fmt: str, **filters) -> AsyncIterator[str]:
+    return export_rows(record_query(**filters), RECORD_COLUMNS, record_csv_row, record_from_row, fmt)
+
+def export_anomalies(fmt: str, **filters) -> AsyncIterator[str]:
+    return export_rows(anomaly_query(**filters), ANOMALY_COLUMNS, anomaly_csv_row, anomaly_from_row, fmt)
+
+def export_filename(kind: str, fmt: str, donem_from: Optional[date] = None, donem_to: Optional[date] = None) -> str:
+    """ör. anomaliler_2024-01_2024-06.csv"""
+    parts = [kind] + [d.strftime("%Y-%m") for d in (donem_from, donem_to) if d is not None]
+    return "_".join(parts) + "." + EXPORT_FORMATS[fmt][1]
@@ -0,0 +1,131 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from src.app.db.models import PayrollRecord
+from src.app.services.anomaly_engine import HISTORY_METRICS, VALUE_FIELDS, PayrollColumns, month_index
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from datetime import date
+import numpy as np
+
+# Yeni personel/ay geldiğinde diziler bu oranla büyütülür
+GROWTH_FACTOR = 2
+
+# Tutulan düzlemler: geçmiş metrikleri ve denklik kuralı için toplam ödeme (what-if anlık görüntüsü)
+INDEX_METRICS = HISTORY_METRICS + ("odeme",)
+
+class HistoryIndex:
+    """Personel x ay yoğun dizileri: her metrik için (personel, takvim ayı) -> değer, boşlar NaN"""
+
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self._base_month: Optional[int] = None
+        self._months = 0
+        self._data = np.full((len(INDEX_METRICS), 0, 0), np.nan)
+        self.loaded = False
+        # Her değişiklikte artar; türetilmiş görünümler bununla geçersizleşir
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def clear(self):
+        version = self.version
+        self.__init__()
+        self.version = version + 1
+
+    def _reserve(self, employees: int, first_month: int, last_month: int):
+        """Kapasiteyi personel sayısı ve [first_month, last_month] aralığına göre genişletir"""
+        if self._base_month is None:
+            self._base_month = first_month
+        shift = max(0, self._base_month - first_month)
+        months = max(self._months + shift, last_month - (self._base_month - shift) + 1)
+        _, cap_rows, cap_months = self._data.shape
+        if employees <= cap_rows and months <= cap_months and shift == 0:
+            self._months = months
+            return
+
+        new_rows = max(employees, cap_rows * GROWTH_FACTOR if employees > cap_rows else cap_rows, 16)
+        new_months = max(months, cap_months * GROWTH_FACTOR if months > cap_months else cap_months, 12)
+        data = np.full((len(INDEX_METRICS), new_rows, new_months), np.nan)
+        # Daha eski bir ay geldiyse mevcut sütunlar sağa kayar
+        data[:, :cap_rows, shift:shift + self._months] = self._data[:, :, :self._months]
+        self._data = data
+        self._base_month -= shift
+        self._months = months
+
+    def _row_ids(self, names: Sequence[str]) -> np.ndarray:
+        rows = self._rows
+        return np.fromiter((rows.setdefault(name, len(rows)) for name in names), dtype=np.intp, count=len(names))
+
+    def update(self, cols: PayrollColumns):
+        """Kaydedilen satırları yazar; aynı (personel, ay) için son gelen geçerlidir"""
+        if not len(cols):
+            return
+        months = np.fromiter((month_index(d) for d in cols.donem), dtype=np.intp, count=len(cols))
+        rows = self._row_ids(cols.names)
+        self._reserve(len(self._rows), int(months.min()), int(months.max()))
+        self._data[:, rows, months - self._base_month] = np.vstack([cols.history_values(), cols.totals()[2]])
+        self.version += 1
+
+    def discard(self, names: Sequence[str], period: date):
+        """Silinen (personel, ay) hücrelerini boşaltır"""
+        if self._base_month is None:
+            return
+        month = month_index(period) - self._base_month
+        rows = [self._rows[name] for name in names if name in self._rows]
+        if not rows or not 0 <= month < self._months:
+            return
+        self._data[:, rows, month] = np.nan
+        self.version += 1
+
+    def window(self, cols: PayrollColumns, size: int) -> np.ndarray:
+        """Her satır için kendi ayından önceki `size` takvim ayı: (metrik, satır, ay) dizisi"""
+        n = len(cols)
+        metrics = len(HISTORY_METRICS)
+        result = np.full((metrics, n, size), np.nan)
+        if n == 0 or self._base_month is None:
+            return result
+
+        known = np.fromiter((name in self._rows for name in cols.names), dtype=bool, count=n)
+        rows = np.fromiter((self._rows.get(name, 0) for name in cols.names), dtype=np.intp, count=n)
+        months = np.fromiter((month_index(d) for d in cols.donem), dtype=np.intp, count=n) - self._base_month
+        # En eski aydan bir önceki aya doğru sütunlar
+        offsets = months[:, None] - np.arange(size, 0, -1)[None, :]
+        valid = known[:, None] & (offsets >= 0) & (offsets < self._months)
+        gathered = self._data[:metrics, rows[:, None], np.clip(offsets, 0, max(self._months - 1, 0))]
+        result[:, valid] = gathered[:, valid]
+        return result
+
+    def snapshot(self) -> Tuple[np.ndarray, Optional[int]]:
+        """Dolu kısım (INDEX_METRICS, personel, ay) ve ilk ayın month_index değeri; kopyalanmaz"""
+        return self._data[:, :len(self._rows), :self._months], self._base_month
+
+    async def ensure_loaded(self, db: AsyncSession):
+        """İlk kullanımda tüm geçmiş tek sorguyla yüklenir; sonrasında yalnızca artımlı güncellenir"""
+        if self.loaded:
+            return
+        query = select(
+            PayrollRecord.personel_ad, PayrollRecord.donem,
+            *(getattr(PayrollRecord, field) for field in VALUE_FIELDS)
+        ).order_by(PayrollRecord.id)
+        rows: List = (await db.execute(query)).all()
+        self.update(PayrollColumns.from_rows(rows))
+        self.loaded = True
+
+    async def reload_periods(self, db: AsyncSession, periods: Iterable[date]):
+        """Geri alınan yazmanın dönemleri: hücreler boşaltılıp veritabanındaki (commit edilmiş) haliyle yeniden yüklenir"""
+        if not self.loaded:
+            return
+        periods = set(periods)
+        if self._base_month is not None:
+            for period in periods:
+                month = month_index(period) - self._base_month
+                if 0 <= month < self._months:
+                    self._data[:, :, month] = np.nan
+        query = select(
+            PayrollRecord.personel_ad, PayrollRecord.donem,
+            *(getattr(PayrollRecord, field) for field in VALUE_FIELDS)
+        ).where(PayrollRecord.donem.in_(periods)).order_by(PayrollRecord.id)
+        self.update(PayrollColumns.from_rows((await db.execute(query)).all()))
+        self.version += 1
+
+history_index = HistoryIndex()
@@ -0,0 +1,296 @@
+from typing import AsyncIterator, Dict, Any, List, Optional, Set, Tuple
+from src.app.core.config import settings
+from src.app.db.bulk import DuplicateRecordError
+from src.app.db.session import ReadSessionLocal
+from src.app.services.anomaly_service import AnomalyService
+from src.app.services.history_index import HistoryIndex
+from src.app.services.payroll_batch import PayrollBatch
+from src.app.services.anomaly_engine import RuleThresholds, TotalsIndex
+from src.app.services.write_queue import write_queue
+from src.app.core.metrics import metrics, stage
+from src.app.services.upload_buffer import DocumentSource
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from contextlib import aclosing
+from datetime import date
+import json
+import os
+import threading
+
+class IngestProgress:
+    """Yüklemenin veritabanına verilmiş kayıt sayısı; akış yarıda kesilse de çağıran okuyabilir"""
+
+    def __init__(self):
+        self.records_written = 0
+        # Son parti (dönem yenilemesiyle birlikte) kuyruğa verildi
+        self.completed = False
+
+    @property
+    def partial(self) -> bool:
+        """Dosyanın yalnızca bir kısmı yazıldı (düşük bellek modunda ara partiler)"""
+        return bool(self.records_written) and not self.completed
+
+    def fields(self) -> Dict[str, Any]:
+        return {"records_written": self.records_written, "partial": self.partial}
+
+async def stream_ingest(
+    source: DocumentSource,
+    cancel_event: Optional[threading.Event] = None,
+    digest: Optional[str] = None,
+    thresholds: Optional[RuleThresholds] = None,
+    progress: Optional[IngestProgress] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """PDF'i sayfa sayfa işler; her parça için anomali çerçevesi, sonunda özet çerçevesi üretir.
+
+    Düşük bellek modunda kayıtlar LOW_MEMORY_COMMIT_ROWS biriktikçe yazılır; anomali tablosu dosya
+    bitince bir kez yenilenir. Okunamayan sayfalar ve tekrar eden personel hata çerçevesiyle bildirilir.
+    Hata ve özet çerçeveleri o ana kadar yazılan kayıtları records_written/partial ile bildirir.
+    """
+    from src.app.services.pdf_service import PageExtractionError
+    if progress is None:
+        progress = IngestProgress()
+    try:
+        async with aclosing(_ingest_frames(source, cancel_event, digest, thresholds, progress=progress)) as frames:
+            async for frame in frames:
+                yield frame
+    except PageExtractionError as e:
+        yield {
+            "type": "error",
+            "detail": f"PDF tam okunamadı: {e}",
+            "failed_pages": [page + 1 for page in e.pages],
+            **progress.fields()
+        }
+    except DuplicateRecordError as e:
+        yield {"type": "error", "detail": str(e), "duplicates": e.names, **progress.fields()}
+
+async def _ingest_frames(
+    source: DocumentSource,
+    cancel_event: Optional[threading.Event],
+    digest: Optional[str],
+    thresholds: Optional[RuleThresholds],
+    kept: Optional[Dict[date, Set[str]]] = None,
+    progress: Optional[IngestProgress] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """stream_ingest gövdesi; PageExtractionError ve DuplicateRecordError çağırana yükselir.
+
+    kept: aynı istekte önceden yazılmış dosyaların dönem kadroları; dönem değiştirilirken korunur ve
+    bu dosyanın isimleriyle güncellenir.
+    """
+    from src.app.services.pdf_service import iter_payroll_pdf
+    batches: List[PayrollBatch] = []
+    pending_rows = 0
+    # Ara partilerle yazılmış, henüz anomalileri yenilenmemiş dönemler
+    written_periods: Set[date] = set()
+    # Dosyadaki personel; tekrar eden isim reddedilir, dönemin yeni kadrosu bu kümedir
+    names: Set[str] = set()
+    period: Optional[date] = None
+    total_records = 0
+    anomaly_count = 0
+    if progress is None:
+        progress = IngestProgress()
+    # Akış yarıda bırakılırsa arka plandaki ayrıştırma da durdurulur
+    if cancel_event is None:
+        cancel_event = threading.Event()
+
+    try:
+        # Yanıt akarken istek bağımlılıkları kapanmış olabilir, oturum burada açılır
+        async with ReadSessionLocal() as db:
+            pages = iter_payroll_pdf(source, cancel_event=cancel_event, digest=digest)
+            async for batch, pages_done, num_pages in iterate_in_threadpool(pages):
+                duplicates = batch.duplicate_names(names)
+                if duplicates:
+                    raise DuplicateRecordError(duplicates)
+                with stage("anomalies"):
+                    anomalies = await AnomalyService.get_anomalies(db, batch, thresholds)
+                batches.append(batch)
+                pending_rows += len(batch)
+                period = batch.period
+                total_records += len(batch)
+                anomaly_count += len(anomalies)
+                if settings.LOW_MEMORY_MODE and pending_rows >= settings.LOW_MEMORY_COMMIT_ROWS:
+                    # Okuma bağlantısı yazıcı beklenirken tutulmaz; sonraki parçada yeniden açılır
+                    await db.close()
+                    with stage("commit"):
+                        written = await write_queue.enqueue(batches, refresh=(), replace={})
+                        # Kuyruğa giren parti bu görev iptal edilse de yazılır; sayaç ve yenileme listesi hemen güncellenir
+                        written_periods.update(b.period for b in batches)
+                        progress.records_written += pending_rows
+                        await written
+                    batches, pending_rows = [], 0
+                yield {
+                    "type": "chunk",
+                    "pages_done": pages_done,
+                    "total_pages": num_pages,
+                    "records": len(batch),
+                    "anomalies": anomalies
+                }
+
+            if cancel_event.is_set():
+                return
+
+            if not total_records:
+                yield {"type": "error", "detail": "PDF'den veri okunamadı veya format geçersiz.", **progress.fields()}
+                return
+
+        # Dönemin yeni kadrosu; aynı istekteki önceki dosyaların personeli de korunur
+        keep = names
+        if kept is not None:
+            keep = kept.setdefault(period, set())
+            keep |= names
+        # Kayıt ve anomali tablosunun yenilenmesi tek yazıcıda, diğer yüklemelerle birlikte yapılır
+        with stage("commit"):
+            written = await write_queue.enqueue(
+                batches, written_periods.union(b.period for b in batches), replace={period: keep}
+            )
+            progress.records_written = total_records
+            progress.completed = True
+            await written
+    finally:
+        cancel_event.set()
+        if written_periods and not progress.completed:
+            # Yazılmış partiler geri alınamaz; en azından anomali tablosu ve özetler onlarla tutarlı kalır
+            write_queue.refresh_later(written_periods)
+
+    metrics.inc("uploads_total")
+    metrics.inc("anomalies_detected_total", anomaly_count)
+
+    yield {
+        "type": "summary",
+        "message": f"{total_records} kayıt başarıyla işlendi.",
+        "total_records": total_records,
+        "anomaly_count": anomaly_count,
+        "donem": period.strftime("%Y-%m") if period else None,
+        **progress.fields()
+    }
+
+async def ingest_bounded(
+    source: DocumentSource,
+    digest: Optional[str] = None,
+    thresholds: Optional[RuleThresholds] = None,
+    kept: Optional[Dict[date, Set[str]]] = None
+) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Düşük bellek modunda akışsız yüklemeler: dosya stream_ingest ile işlenir; (özet çerçevesi, anomaliler).
+
+    Veri okunamazsa None döner; okunamayan sayfalarda PageExtractionError, tekrar eden personelde
+    DuplicateRecordError yükselir.
+    """
+    anomalies = []
+    summary = None
+    async with aclosing(_ingest_frames(source, None, digest, thresholds, kept)) as frames:
+        async for frame in frames:
+            if frame["type"] == "chunk":
+                anomalies.extend(frame["anomalies"])
+            elif frame["type"] == "summary":
+                summary = frame
+    return (summary, anomalies) if summary else None
+
+async def ingest_files(
+    db: AsyncSession, file_paths: List[str], thresholds: Optional[RuleThresholds] = None
+) -> Dict[str, Any]:
+    """Dosyaları ortak işçi kuyruğunda ayrıştırır, dönemleri eskiden yeniye değerlendirip birlikte kaydeder"""
+    if settings.LOW_MEMORY_MODE:
+        return await _ingest_files_bounded(db, file_paths, thresholds)
+    from src.app.services.pdf_service import parse_payroll_pdfs
+    with stage("parse"):
+        parsed = await run_in_threadpool(parse_payroll_pdfs, file_paths)
+    # Artış kuralı önceki ayı görebilsin diye eski dönemler önce değerlendirilir
+    parsed.sort(key=lambda item: item[1].period if item[1] else date.max)
+
+    files = []
+    all_anomalies = []
+    batches = []
+    # Henüz kaydedilmemiş önceki dosyaların toplam kazançları ve geçmişi; artış ve aykırı değer kuralları bunları da görür.
+    # Ortak geçmiş dizini burada değişmez; yazıcı dönemleri kaydederken günceller
+    pending_totals: TotalsIndex = {}
+    pending_history = HistoryIndex()
+    total_records = 0
+    for file_path, batch in parsed:
+        duplicates = batch.duplicate_names()
+        if duplicates:
+            raise DuplicateRecordError(duplicates, os.path.basename(file_path))
+        anomalies = []
+        if batch:
+            cols = batch.to_columns()
+            with stage("anomalies"):
+                anomalies = await AnomalyService.get_anomalies_for_columns(
+                    db, cols, thresholds, pending_totals, pending_history
+                )
+            pending_history.update(cols)
+            pending_totals.update(zip(zip(cols.names, cols.donem), cols.totals()[0].tolist()))
+            batches.append(batch)
+            total_records += len(batch)
+            all_anomalies.extend(anomalies)
+        files.append({
+            "filename": os.path.basename(file_path),
+            "donem": batch.period.strftime("%Y-%m") if batch else None,
+            "records": len(batch),
+            "anomaly_count": len(anomalies)
+        })
+
+    if total_records:
+        # Okuma bağlantısı yazıcı beklenirken tutulmaz
+        await db.close()
+        with stage("commit"):
+            await write_queue.submit(batches)
+
+    if total_records:
+        metrics.inc("uploads_total", sum(1 for f in files if f["records"]))
+        metrics.inc("anomalies_detected_total", len(all_anomalies))
+
+    return {
+        "message": f"{len(file_paths)} dosyadan {total_records} kayıt başarıyla işlendi.",
+        "total_records": total_records,
+        "files": files,
+        "anomalies": all_anomalies
+    }
+
+async def _ingest_files_bounded(
+    db: AsyncSession, file_paths: List[str], thresholds: Optional[RuleThresholds] = None
+) -> Dict[str, Any]:
+    """Düşük bellek modu: dosyalar eskiden yeniye tek tek işlenip kaydedilir.
+
+    Dönem, dosya ayrıştırılmadan ilk sayfa başlığından okunur; her dosya bir sonrakinden önce yazıldığından
+    artış kuralı önceki ayın kayıtlı halini görür, yanıt ingest_files ile aynı olur.
+    """
+    from src.app.services.pdf_service import PageExtractionError, read_period
+    # İstek oturumu kullanılmaz; her dosya kendi okuma oturumunu açar
+    await db.close()
+    periods = {}
+    for file_path in file_paths:
+        periods[file_path] = await run_in_threadpool(read_period, file_path)
+    # Başlığı okunamayan dosyalar en sona kalır
+    file_paths = sorted(file_paths, key=lambda path: periods[path] or date.max)
+
+    files = []
+    all_anomalies = []
+    total_records = 0
+    # Aynı döneme ait dosyalar, ingest_files'taki tek yazma isteği gibi birbirinin kayıtlarını silmez
+    kept: Dict[date, Set[str]] = {}
+    for file_path in file_paths:
+        try:
+            result = await ingest_bounded(file_path, thresholds=thresholds, kept=kept)
+        except PageExtractionError as e:
+            raise PageExtractionError(e.pages, e.reason, os.path.basename(file_path)) from None
+        except DuplicateRecordError as e:
+            raise DuplicateRecordError(e.names, os.path.basename(file_path)) from None
+        summary, anomalies = result if result else ({"donem": None, "total_records": 0}, [])
+        files.append({
+            "filename": os.path.basename(file_path),
+            "donem": summary["donem"],
+            "records": summary["total_records"],
+            "anomaly_count": len(anomalies)
+        })
+        total_records += summary["total_records"]
+        all_anomalies.extend(anomalies)
+
+    return {
+        "message": f"{len(file_paths)} dosyadan {total_records} kayıt başarıyla işlendi.",
+        "total_records": total_records,
+        "files": files,
+        "anomalies": all_anomalies
+    }
+
+async def ndjson_frames(frames: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Her çerçeveyi tek satırlık JSON (NDJSON) olarak yazar"""
+    async for frame in frames:
+        yield json.dumps(frame, ensure_ascii=False) + "\n"
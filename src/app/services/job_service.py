@@ -0,0 +1,126 @@
+from typing import Callable, Dict, Any, List, Optional
+from src.app.services.ingest_service import IngestProgress, stream_ingest
+from src.app.services.upload_buffer import DocumentSource
+from src.app.services.anomaly_engine import RuleThresholds
+from datetime import datetime
+from collections import OrderedDict
+import asyncio
+import threading
+import uuid
+
+# Bellekte tutulan tamamlanmış iş sayısı
+MAX_FINISHED_JOBS = 100
+
+class IngestJob:
+    """Arka planda işlenen tek bir PDF"""
+
+    def __init__(self, filename: str, source: DocumentSource, digest: Optional[str] = None,
+                 cleanup: Optional[Callable[[], None]] = None, thresholds: Optional[RuleThresholds] = None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.source = source
+        self.digest = digest
+        self.cleanup = cleanup
+        self.thresholds = thresholds
+        self.status = "queued"
+        self.pages_done = 0
+        self.total_pages = 0
+        self.records = 0
+        # Veritabanına yazılan kayıtlar; düşük bellek modunda iptal edilen veya hata veren işlerde de kalır
+        self.progress = IngestProgress()
+        self.anomalies: List[Dict[str, Any]] = []
+        self.message: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.cancel_event = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "records": self.records,
+            **self.progress.fields(),
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            # Sonuçlar yalnızca iş başarıyla bittiğinde döner
+            "anomalies": self.anomalies if self.status == "completed" else None
+        }
+
+class JobManager:
+    def __init__(self):
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+
+    def submit(self, filename: str, source: DocumentSource, digest: Optional[str] = None,
+               cleanup: Optional[Callable[[], None]] = None, thresholds: Optional[RuleThresholds] = None) -> IngestJob:
+        """İşi kaydeder ve olay döngüsünü bekletmeden arka planda başlatır"""
+        job = IngestJob(filename, source, digest, cleanup, thresholds)
+        self._jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[IngestJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_event.set()
+        if job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def _run(self, job: IngestJob):
+        job.status = "running"
+        try:
+            # Ayrıştırma iş parçacığı havuzunda, kayıt aiosqlite üzerinden yapılır
+            async for frame in stream_ingest(
+                job.source, cancel_event=job.cancel_event, digest=job.digest, thresholds=job.thresholds,
+                progress=job.progress
+            ):
+                if frame["type"] == "chunk":
+                    job.pages_done = frame["pages_done"]
+                    job.total_pages = frame["total_pages"]
+                    job.records += frame["records"]
+                    job.anomalies.extend(frame["anomalies"])
+                elif frame["type"] == "error":
+                    job.status = "failed"
+                    job.error = frame["detail"]
+                elif frame["type"] == "summary":
+                    job.status = "completed"
+                    job.message = frame["message"]
+            if not job.finished:
+                # Akış özet olmadan bitti: iş iptal edilmiş demektir
+                job.status = "cancelled"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"Error in job {job.id}: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            if job.status == "cancelled":
+                job.anomalies = []
+            # Yüklemenin paylaşımlı belleği / geçici dosyası iş bitince bırakılır
+            if job.cleanup:
+                job.cleanup()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+job_manager = JobManager()
@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, Optional, Tuple
+from bisect import bisect_right
+
+# Tablo çizgilerini aynı kabul etme toleransı (table_settings ile aynı)
+SNAP_TOLERANCE = 3
+EDGE_MIN_LENGTH = 3
+# Bordro tablosunun sütun sayısı; tabloyu çizen yatay çizgiler en az bu kadar sütunu keser
+MIN_COLUMNS = 17
+
+PERIOD_PATTERN = r'\d{4}\s+\w+\s+Dönemi'
+
+Rows = List[List[Optional[str]]]
+
+def _cluster(values: List[float], tolerance: float) -> List[float]:
+    """Birbirine yakın koordinatları ortalamalarına indirger"""
+    clusters: List[List[float]] = []
+    for v in sorted(values):
+        if clusters and v - clusters[-1][-1] <= tolerance:
+            clusters[-1].append(v)
+        else:
+            clusters.append([v])
+    return [sum(c) / len(c) for c in clusters]
+
+def _edges(page, orientation: str) -> List[Dict[str, Any]]:
+    return [
+        e for e in page.edges
+        if e["orientation"] == orientation
+        and (e["height"] if orientation == "v" else e["width"]) >= EDGE_MIN_LENGTH
+    ]
+
+class LayoutTemplate:
+    """Aynı bordro programının sayfaları için öğrenilmiş sütun sınırları ve başlık bölgesi"""
+
+    def __init__(self, columns: List[float], header_bottom: Optional[float]):
+        self.columns = columns
+        self.header_bottom = header_bottom
+
+    @classmethod
+    def learn(cls, page, tables: list) -> Optional["LayoutTemplate"]:
+        """Tam çizgi algılamasıyla bulunmuş tablolardan şablon çıkarır"""
+        if not tables:
+            return None
+        table = max(tables, key=lambda t: len(t.cells))
+        xs = [c[0] for c in table.cells] + [c[2] for c in table.cells]
+        columns = _cluster(xs, SNAP_TOLERANCE)
+        if len(columns) - 1 < MIN_COLUMNS:
+            return None
+
+        header_bottom = None
+        matches = page.search(PERIOD_PATTERN)
+        if matches:
+            # Başlık tablonun üstünde kalmalı
+            header_bottom = min(matches[0]["bottom"], table.bbox[1])
+        return cls(columns, header_bottom)
+
+    def extract(self, page, text_settings: Dict[str, Any]) -> Optional[Tuple[Rows, str]]:
+        """(tablo satırları, başlık metni); sayfa şablona uymuyorsa None"""
+        # pdfplumber yalnızca bu motor kullanılırken yüklenir; sabitler pdfium motoruyla da paylaşılır
+        from pdfplumber import utils
+        v_edges = _edges(page, "v")
+        v_xs = _cluster([e["x0"] for e in v_edges], SNAP_TOLERANCE)
+        for x in self.columns:
+            if not any(abs(v - x) <= SNAP_TOLERANCE for v in v_xs):
+                return None
+
+        # Tablonun dikey sınırları şablon sütunlarına oturan dikey çizgilerden gelir
+        aligned = [
+            e for e in v_edges
+            if any(abs(e["x0"] - x) <= SNAP_TOLERANCE for x in (self.columns[0], self.columns[-1]))
+        ]
+        if not aligned:
+            return None
+        table_top = min(e["top"] for e in aligned) - SNAP_TOLERANCE
+        table_bottom = max(e["bottom"] for e in aligned) + SNAP_TOLERANCE
+        left, right = self.columns[0], self.columns[-1]
+
+        ys = _cluster([
+            e["top"] for e in _edges(page, "h")
+            if table_top <= e["top"] <= table_bottom and e["x0"] < right and e["x1"] > left
+        ], SNAP_TOLERANCE)
+        if len(ys) < 2:
+            return None
+
+        n_cols = len(self.columns) - 1
+        n_rows = len(ys) - 1
+        cells: List[List[list]] = [[[] for _ in range(n_cols)] for _ in range(n_rows)]
+        header_chars = []
+        # Karakterler tek geçişte hücrelere dağıtılır (Table.extract ile aynı orta nokta kuralı)
+        for char in page.chars:
+            if self.header_bottom is not None and char["bottom"] <= self.header_bottom + SNAP_TOLERANCE:
+                header_chars.append(char)
+            h_mid = (char["x0"] + char["x1"]) / 2
+            v_mid = (char["top"] + char["bottom"]) / 2
+            col = bisect_right(self.columns, h_mid) - 1
+            row = bisect_right(ys, v_mid) - 1
+            if 0 <= col < n_cols and 0 <= row < n_rows:
+                cells[row][col].append(char)
+
+        rows = [
+            [utils.extract_text(chars, **text_settings) if chars else "" for chars in row]
+            for row in cells
+        ]
+        header_text = utils.extract_text(header_chars) if header_chars else ""
+        return rows, header_text
@@ -0,0 +1,36 @@
+from typing import Any, Optional, Tuple
+from datetime import date
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+Cursor = Tuple[str, date, int]
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(personel_ad: str, donem: date, row_id: int) -> str:
+    """(personel_ad, donem, id) anahtarını URL'de taşınabilir, opak bir imlece çevirir"""
+    raw = json.dumps([personel_ad, donem.isoformat(), row_id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        personel_ad, donem, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(personel_ad), date.fromisoformat(donem), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e)) from e
+
+def like_prefix(prefix: str) -> str:
+    """LIKE joker karakterlerini kaçışlayarak önek deseni üretir ('\\' ile kullanılır)"""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+def split_page(rows: list, limit: int, key: Any) -> Tuple[list, Optional[str]]:
+    """limit + 1 satır çekilmiş sonuçtan (sayfa, sonraki imleç) üretir"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
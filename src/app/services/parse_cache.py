@@ -0,0 +1,118 @@
+from typing import Optional, Tuple
+from src.app.core.config import settings
+from src.app.services.payroll_batch import PayrollBatch
+from datetime import date
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+
+# Ayrıştırıcı çıktısı değiştiğinde artırılır; eski kayıtlar geçersiz olur
+PARSER_VERSION = 4
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# (satırlar, sayfa sayısı); dönem partinin içindedir
+CachedParse = Tuple[PayrollBatch, int]
+
+def file_digest(file_path: str) -> str:
+    """Dosya içeriğinin SHA-256 özeti"""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class ParseCache:
+    """data.db yanında tutulan, içerik adresli ve LRU ile sınırlanan ayrıştırma önbelleği"""
+
+    def __init__(self, path: str, max_bytes: int, version: int = PARSER_VERSION):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                " digest TEXT PRIMARY KEY, version INTEGER NOT NULL,"
+                " period TEXT, num_pages INTEGER NOT NULL,"
+                " payload BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            # Farklı ayrıştırıcı sürümüyle yazılmış kayıtlar temizlenir
+            conn.execute("DELETE FROM parse_cache WHERE version != ?", (self.version,))
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def get(self, digest: str) -> Optional[CachedParse]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT period, num_pages, payload FROM parse_cache WHERE digest = ? AND version = ?",
+                    (digest, self.version)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE parse_cache SET last_used = ? WHERE digest = ?", (time.time(), digest))
+                conn.commit()
+            finally:
+                conn.close()
+
+        period, num_pages, payload = row
+        batch = PayrollBatch.from_bytes(zlib.decompress(payload), date.fromisoformat(period) if period else None)
+        return batch, num_pages
+
+    def put(self, digest: str, batch: PayrollBatch, num_pages: int):
+        payload = zlib.compress(batch.to_bytes())
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO parse_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (digest, self.version, batch.period.isoformat() if batch.period else None,
+                     num_pages, payload, len(payload), time.time())
+                )
+                self._evict(conn)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Toplam boyut sınırı aşılırsa en uzun süredir kullanılmayanlar silinir"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM parse_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, size in conn.execute("SELECT digest, size FROM parse_cache ORDER BY last_used").fetchall():
+            conn.execute("DELETE FROM parse_cache WHERE digest = ?", (digest,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM parse_cache")
+                conn.commit()
+            finally:
+                conn.close()
+
+_cache: Optional[ParseCache] = None
+
+def get_parse_cache() -> Optional[ParseCache]:
+    """Ayarlarda kapalıysa None döner"""
+    global _cache
+    if not settings.PARSE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ParseCache(settings.PARSE_CACHE_PATH, settings.PARSE_CACHE_MAX_BYTES)
+    return _cache
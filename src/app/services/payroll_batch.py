@@ -0,0 +1,91 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+from src.app.db.models import PayrollRecord
+from src.app.services.anomaly_engine import VALUE_FIELDS, PayrollColumns
+from array import array
+from datetime import date
+import json
+import numpy as np
+
+class PayrollBatch:
+    """Tek döneme ait bordro satırları: isim listesi ve VALUE_FIELDS sırasıyla sütun başına array('d').
+
+    İşçi süreçlerden ana sürece bu biçimde döner; diziler ham bayt olarak pickle edilir,
+    NumPy'a kopyasız görünür. ORM nesneleri yalnızca to_records() ile gerektiğinde üretilir.
+    """
+
+    def __init__(self, names: Optional[List[str]] = None, columns: Optional[Dict[str, array]] = None,
+                 period: Optional[date] = None):
+        self.names = names if names is not None else []
+        self.columns = columns if columns is not None else {field: array("d") for field in VALUE_FIELDS}
+        self.period = period
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, name: str, values: Sequence[float]):
+        """values: VALUE_FIELDS sırasıyla"""
+        self.names.append(name)
+        for field, value in zip(VALUE_FIELDS, values):
+            self.columns[field].append(value)
+
+    def extend(self, other: "PayrollBatch"):
+        self.names.extend(other.names)
+        for field in VALUE_FIELDS:
+            self.columns[field].extend(other.columns[field])
+
+    @classmethod
+    def concat(cls, batches: Iterable["PayrollBatch"], period: Optional[date] = None) -> "PayrollBatch":
+        result = cls(period=period)
+        for batch in batches:
+            result.extend(batch)
+        return result
+
+    def duplicate_names(self, seen: Optional[Set[str]] = None) -> List[str]:
+        """Partide (seen verilirse aynı dosyanın önceki partileriyle birlikte) birden fazla geçen isimler; seen güncellenir"""
+        seen = set() if seen is None else seen
+        duplicates = []
+        for name in self.names:
+            if name in seen:
+                duplicates.append(name)
+            else:
+                seen.add(name)
+        return list(dict.fromkeys(duplicates))
+
+    def to_columns(self) -> PayrollColumns:
+        """Anomali motoru için görünüm; sütunlar kopyalanmaz"""
+        columns = {
+            field: np.frombuffer(self.columns[field], dtype=np.float64) if len(self) else np.empty(0)
+            for field in VALUE_FIELDS
+        }
+        return PayrollColumns(self.names, [self.period] * len(self), columns)
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Toplu ekleme için sütun adı -> değer sözlükleri (tek tek, bellekte tutulmaz)"""
+        columns = [self.columns[field] for field in VALUE_FIELDS]
+        for i, name in enumerate(self.names):
+            row = {"personel_ad": name, "donem": self.period}
+            for field, column in zip(VALUE_FIELDS, columns):
+                row[field] = column[i]
+            yield row
+
+    def to_records(self) -> List[PayrollRecord]:
+        return [PayrollRecord(**row) for row in self.rows()]
+
+    def to_bytes(self) -> bytes:
+        """Önbellek için: JSON isim listesi, NUL ayırıcı ve ardışık sütun baytları"""
+        header = json.dumps(self.names, ensure_ascii=False).encode("utf-8")
+        return b"".join([header, b"\0"] + [self.columns[field].tobytes() for field in VALUE_FIELDS])
+
+    @classmethod
+    def from_bytes(cls, payload: bytes, period: Optional[date] = None) -> "PayrollBatch":
+        # JSON kontrol karakterlerini kaçışladığından ilk NUL başlığın sonudur
+        split = payload.index(b"\0")
+        names = json.loads(payload[:split].decode("utf-8"))
+        body = memoryview(payload)[split + 1:]
+        width = len(names) * array("d").itemsize
+        columns = {}
+        for i, field in enumerate(VALUE_FIELDS):
+            column = array("d")
+            column.frombytes(body[i * width:(i + 1) * width])
+            columns[field] = column
+        return cls(names, columns, period)
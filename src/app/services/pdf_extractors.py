@@ -0,0 +1,353 @@
+from typing import BinaryIO, Dict, List, Optional, Tuple, Type
+from abc import ABC, abstractmethod
+from datetime import datetime
+from bisect import bisect_right
+from src.app.services.layout_template import EDGE_MIN_LENGTH, MIN_COLUMNS, SNAP_TOLERANCE, Rows, _cluster
+import re
+
+# Hücre metni: bu yataydan büyük boşluk kelime, bu dikeyden büyük fark satır ayırır
+X_TOLERANCE = 3
+Y_TOLERANCE = 3
+
+def extract_period(text: str) -> Optional[datetime]:
+    match = re.search(r'(\d{4})\s+(\w+)\s+Dönemi', text)
+    if match:
+        year = int(match.group(1))
+        month_str = match.group(2).lower()
+        month_map = {
+            'ocak': 1, 'şubat': 2, 'mart': 3, 'nisan': 4,
+            'mayıs': 5, 'haziran': 6, 'temmuz': 7, 'ağustos': 8,
+            'eylül': 9, 'ekim': 10, 'kasım': 11, 'aralık': 12
+        }
+        month = month_map.get(month_str, 1)
+        return datetime(year, month, 1)
+    return None
+
+class PdfExtractor(ABC):
+    """Tek belgenin sayfalarından bordro tablosu satırlarını çıkaran motor.
+
+    Satırlar pdfplumber Table.extract biçimindedir: sütun başına metin (boş hücre "" veya None).
+    Motorlar işçi süreçte belge başına bir kez açılır; ağır modüller preload() ile önceden yüklenir.
+    """
+
+    name = ""
+
+    @classmethod
+    def preload(cls):
+        pass
+
+    @abstractmethod
+    def __init__(self, stream: BinaryIO):
+        ...
+
+    @property
+    @abstractmethod
+    def page_count(self) -> int:
+        ...
+
+    @abstractmethod
+    def extract_page(self, index: int, need_period: bool) -> Tuple[Rows, Optional[datetime]]:
+        """Sayfanın tablo satırları ve (istenirse) dönem başlığı"""
+
+    @abstractmethod
+    def page_period(self, index: int) -> Optional[datetime]:
+        """Yalnızca sayfa metnindeki dönem başlığı; tablo çıkarılmaz"""
+
+    def release_pages(self, indices: List[int]):
+        """Belge açık kalır, bu sayfaların önbellekleri bırakılır"""
+
+    def trim(self):
+        """Düşük bellek modu: belge düzeyinde ayrıştırılmış nesneler de bırakılır (gerekirse yeniden okunur)"""
+
+    @abstractmethod
+    def close(self):
+        ...
+
+class PdfplumberExtractor(PdfExtractor):
+    """pdfminer tabanlı çizgi algılaması; ilk sayfadan öğrenilen şablonla hızlandırılır"""
+
+    name = "pdfplumber"
+
+    # Table settings for speed and accuracy
+    TABLE_SETTINGS = {
+        "vertical_strategy": "lines",
+        "horizontal_strategy": "lines",
+        "snap_tolerance": SNAP_TOLERANCE,
+        "join_tolerance": 3,
+    }
+
+    @classmethod
+    def preload(cls):
+        import pdfplumber  # noqa: F401
+        import pdfminer.layout  # noqa: F401
+
+    def __init__(self, stream: BinaryIO):
+        import pdfplumber
+        from pdfplumber.table import TableSettings
+        from src.app.services.layout_template import LayoutTemplate
+        self.pdf = pdfplumber.open(stream)
+        self.template: Optional[LayoutTemplate] = None
+        self._learn = LayoutTemplate.learn
+        self._table_settings = TableSettings.resolve(self.TABLE_SETTINGS)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pdf.pages)
+
+    def extract_page(self, index: int, need_period: bool) -> Tuple[Rows, Optional[datetime]]:
+        """Önce öğrenilmiş şablon denenir"""
+        page = self.pdf.pages[index]
+        tset = self._table_settings
+        text_settings = tset.text_settings or {}
+        if self.template is not None:
+            extracted = self.template.extract(page, text_settings)
+            if extracted is not None:
+                rows, header_text = extracted
+                period = None
+                if need_period:
+                    period = extract_period(header_text)
+                    if period is None:
+                        # Başlık beklenen yerde değilse tüm sayfa metnine bakılır
+                        period = extract_period(page.extract_text())
+                return rows, period
+
+        # Şablon yok veya sayfa uymuyor: tam çizgi algılaması
+        period = extract_period(page.extract_text()) if need_period else None
+        tables = page.find_tables(tset)
+        if self.template is None:
+            self.template = self._learn(page, tables)
+        rows = [row for table in tables for row in table.extract(**text_settings)]
+        return rows, period
+
+    def page_period(self, index: int) -> Optional[datetime]:
+        page = self.pdf.pages[index]
+        try:
+            return extract_period(page.extract_text())
+        finally:
+            page.close()
+
+    def release_pages(self, indices: List[int]):
+        for idx in indices:
+            self.pdf.pages[idx].close()
+
+    def trim(self):
+        # pdfminer okunan her nesneyi (sayfa içerik akışları dahil) belge kapanana kadar tutar
+        for cache in ("_cached_objs", "_parsed_objs"):
+            getattr(self.pdf.doc, cache, {}).clear()
+
+    def close(self):
+        self.pdf.close()
+
+def _merge_lines(segments: List[Tuple[float, float, float]]) -> List[Tuple[float, float, float]]:
+    """(konum, başlangıç, bitiş) parçaları: aynı hizadakiler birleştirilir, arası açık olanlar ayrı kalır"""
+    positions = _cluster([s[0] for s in segments], SNAP_TOLERANCE)
+    by_position: Dict[int, List[Tuple[float, float]]] = {}
+    for pos, start, end in segments:
+        i = min(range(len(positions)), key=lambda k: abs(positions[k] - pos))
+        by_position.setdefault(i, []).append((start, end))
+
+    lines = []
+    for i, spans in by_position.items():
+        spans.sort()
+        current_start, current_end = spans[0]
+        for start, end in spans[1:]:
+            if start <= current_end + SNAP_TOLERANCE:
+                current_end = max(current_end, end)
+            else:
+                lines.append((positions[i], current_start, current_end))
+                current_start, current_end = start, end
+        lines.append((positions[i], current_start, current_end))
+    return lines
+
+def _covers(lines: List[Tuple[float, float, float]], pos: float, at: float) -> bool:
+    return any(
+        abs(p - pos) <= SNAP_TOLERANCE and start - SNAP_TOLERANCE <= at <= end + SNAP_TOLERANCE
+        for p, start, end in lines
+    )
+
+def _cell_text(chars: List[Tuple[str, float, float, float]]) -> str:
+    """(metin, x0, x1, top) karakterlerinden hücre metni; pdfplumber extract_text ile aynı birleştirme"""
+    lines: List[List[Tuple[str, float, float, float]]] = []
+    for char in sorted(chars, key=lambda c: c[3]):
+        if lines and char[3] - lines[-1][0][3] <= Y_TOLERANCE:
+            lines[-1].append(char)
+        else:
+            lines.append([char])
+
+    out = []
+    for line in lines:
+        words: List[str] = []
+        word = ""
+        last_x1 = None
+        for text, x0, x1, _ in sorted(line, key=lambda c: c[1]):
+            if text.isspace():
+                # Boşluk karakteri kelimeyi bitirir, kendisi yazılmaz
+                if word:
+                    words.append(word)
+                word = ""
+            else:
+                if word and last_x1 is not None and x0 - last_x1 > X_TOLERANCE:
+                    words.append(word)
+                    word = ""
+                word += text
+            last_x1 = x1
+        if word:
+            words.append(word)
+        out.append(" ".join(words))
+    return "\n".join(line for line in out if line)
+
+class PdfiumExtractor(PdfExtractor):
+    """PDFium (C++) üzerinden karakter konumları ve çizgi yolları; pdfminer kullanılmaz.
+
+    Tablo, en az MIN_COLUMNS sütunu kesen yatay çizgiler ve bunları kesen dikey çizgilerden kurulur;
+    karakterler orta noktalarına göre hücrelere dağıtılır (pdfplumber Table.extract ile aynı kural).
+    """
+
+    name = "pdfium"
+
+    @classmethod
+    def preload(cls):
+        import pypdfium2  # noqa: F401
+
+    def __init__(self, stream: BinaryIO):
+        import pypdfium2
+        self.pdf = pypdfium2.PdfDocument(stream)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pdf)
+
+    def _edges(self, page, height: float) -> Tuple[list, list]:
+        """Yol parçalarından (x, top, bottom) dikey ve (top, x0, x1) yatay çizgiler"""
+        import pypdfium2.raw as pdfium_c
+        import ctypes
+
+        vertical, horizontal = [], []
+        x, y = ctypes.c_float(), ctypes.c_float()
+        # Form XObject içindeki nesnelerin matrisi formunkine göredir
+        form_matrices = []
+        for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_PATH, pdfium_c.FPDF_PAGEOBJ_FORM]):
+            level = getattr(obj, "level", 0)
+            del form_matrices[level:]
+            matrix = obj.get_matrix()
+            if form_matrices:
+                matrix = matrix.multiply(form_matrices[-1])
+            if obj.type == pdfium_c.FPDF_PAGEOBJ_FORM:
+                form_matrices.append(matrix)
+                continue
+
+            start = previous = None
+            for i in range(pdfium_c.FPDFPath_CountSegments(obj.raw)):
+                segment = pdfium_c.FPDFPath_GetPathSegment(obj.raw, i)
+                pdfium_c.FPDFPathSegment_GetPoint(segment, x, y)
+                point = matrix.on_point(x.value, y.value)
+                kind = pdfium_c.FPDFPathSegment_GetType(segment)
+                targets = []
+                if kind == pdfium_c.FPDF_SEGMENT_MOVETO:
+                    start = point
+                elif kind == pdfium_c.FPDF_SEGMENT_LINETO and previous is not None:
+                    targets.append((previous, point))
+                if pdfium_c.FPDFPathSegment_GetClose(segment) and start is not None:
+                    targets.append((point, start))
+                for (x0, y0), (x1, y1) in targets:
+                    if abs(x0 - x1) <= 1 and abs(y0 - y1) >= EDGE_MIN_LENGTH:
+                        vertical.append(((x0 + x1) / 2, height - max(y0, y1), height - min(y0, y1)))
+                    elif abs(y0 - y1) <= 1 and abs(x0 - x1) >= EDGE_MIN_LENGTH:
+                        horizontal.append((height - (y0 + y1) / 2, min(x0, x1), max(x0, x1)))
+                previous = point
+        return vertical, horizontal
+
+    def _chars(self, textpage, height: float) -> List[Tuple[str, float, float, float, float]]:
+        """(metin, x0, x1, top, bottom); PDFium'un kendi eklediği boşluk/satır sonları atlanır"""
+        import pypdfium2.raw as pdfium_c
+        import ctypes
+
+        rect = pdfium_c.FS_RECTF()
+        chars = []
+        for i in range(textpage.count_chars()):
+            if pdfium_c.FPDFText_IsGenerated(textpage.raw, i) == 1:
+                continue
+            code = pdfium_c.FPDFText_GetUnicode(textpage.raw, i)
+            if code in (0, 0xFFFE, 0xFFFF) or not pdfium_c.FPDFText_GetLooseCharBox(textpage.raw, i, ctypes.byref(rect)):
+                continue
+            chars.append((chr(code), rect.left, rect.right, height - rect.top, height - rect.bottom))
+        return chars
+
+    def extract_page(self, index: int, need_period: bool) -> Tuple[Rows, Optional[datetime]]:
+        page = self.pdf[index]
+        textpage = page.get_textpage()
+        try:
+            height = page.get_height()
+            period = extract_period(textpage.get_text_range()) if need_period else None
+
+            vertical, horizontal = self._edges(page, height)
+            v_lines, h_lines = _merge_lines(vertical), _merge_lines(horizontal)
+            # Tabloyu çizen yatay çizgiler: en az MIN_COLUMNS + 1 dikey çizgiyi keser
+            ruled = [
+                (y, x0, x1) for y, x0, x1 in h_lines
+                if sum(1 for x, top, bottom in v_lines
+                       if x0 - SNAP_TOLERANCE <= x <= x1 + SNAP_TOLERANCE
+                       and top - SNAP_TOLERANCE <= y <= bottom + SNAP_TOLERANCE) > MIN_COLUMNS
+            ]
+            if len(ruled) < 2:
+                return [], period
+            ys = sorted(y for y, _, _ in ruled)
+            left, right = min(x0 for _, x0, _ in ruled), max(x1 for _, _, x1 in ruled)
+            xs = _cluster([x for x, top, bottom in v_lines
+                           if left - SNAP_TOLERANCE <= x <= right + SNAP_TOLERANCE
+                           and top <= ys[-1] + SNAP_TOLERANCE and bottom >= ys[0] - SNAP_TOLERANCE], SNAP_TOLERANCE)
+            n_rows, n_cols = len(ys) - 1, len(xs) - 1
+            if n_cols < MIN_COLUMNS:
+                return [], period
+
+            # Birleştirilmiş hücreler: satır bandında dikey çizgisi olmayan sınır soldaki hücreye katılır
+            owners = []
+            for r in range(n_rows):
+                middle = (ys[r] + ys[r + 1]) / 2
+                owner, row_owners = 0, []
+                for c in range(n_cols):
+                    if c and _covers(v_lines, xs[c], middle):
+                        owner = c
+                    row_owners.append(owner)
+                owners.append(row_owners)
+
+            cells: List[List[list]] = [[[] for _ in range(n_cols)] for _ in range(n_rows)]
+            for text, x0, x1, top, bottom in self._chars(textpage, height):
+                col = bisect_right(xs, (x0 + x1) / 2) - 1
+                row = bisect_right(ys, (top + bottom) / 2) - 1
+                if 0 <= col < n_cols and 0 <= row < n_rows:
+                    cells[row][owners[row][col]].append((text, x0, x1, top))
+
+            rows: Rows = []
+            for r in range(n_rows):
+                rows.append([
+                    (_cell_text(cells[r][c]) if cells[r][c] else "") if owners[r][c] == c else None
+                    for c in range(n_cols)
+                ])
+            return rows, period
+        finally:
+            textpage.close()
+            page.close()
+
+    def page_period(self, index: int) -> Optional[datetime]:
+        page = self.pdf[index]
+        textpage = page.get_textpage()
+        try:
+            return extract_period(textpage.get_text_range())
+        finally:
+            textpage.close()
+            page.close()
+
+    def close(self):
+        self.pdf.close()
+
+EXTRACTORS: Dict[str, Type[PdfExtractor]] = {
+    PdfplumberExtractor.name: PdfplumberExtractor,
+    PdfiumExtractor.name: PdfiumExtractor,
+}
+
+def get_extractor(name: str) -> Type[PdfExtractor]:
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"Bilinmeyen PDF motoru: {name} (seçenekler: {', '.join(EXTRACTORS)})") from None
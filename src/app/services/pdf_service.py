@@ -1,11 +1,21 @@
-import pdfplumber
-import re
-from datetime import datetime
-from typing import List, Optional, Tuple
-from src.app.db.models import PayrollRecord
+from datetime import date, datetime
+from typing import BinaryIO, Dict, List, Optional, Tuple, Iterator
+from src.app.core.config import settings
+from src.app.services import worker_pool
+from src.app.services.payroll_batch import PayrollBatch
+from src.app.services.parse_cache import get_parse_cache, file_digest
+from src.app.services.pdf_extractors import PdfExtractor, Rows, extract_period, get_extractor  # noqa: F401
+from src.app.core.metrics import metrics, record_pages
+from src.app.services.upload_buffer import DocumentSource, SharedSource, SharedReader, attach_shared, is_upload
+from multiprocessing.shared_memory import SharedMemory
+from collections import OrderedDict
 import concurrent.futures
+import gc
 import os
 import multiprocessing
+import sys
+import threading
+import time
 
 def clean_currency(value: Optional[str]) -> float:
     if value is None or value == '' or value == '0':
@@ -16,119 +26,421 @@ def clean_currency(value: Optional[str]) -> float:
     except ValueError:
         return 0.0
 
-def extract_period(text: str) -> Optional[datetime]:
-    match = re.search(r'(\d{4})\s+(\w+)\s+Dönemi', text)
-    if match:
-        year = int(match.group(1))
-        month_str = match.group(2).lower()
-        month_map = {
-            'ocak': 1, 'şubat': 2, 'mart': 3, 'nisan': 4,
-            'mayıs': 5, 'haziran': 6, 'temmuz': 7, 'ağustos': 8,
-            'eylül': 9, 'ekim': 10, 'kasım': 11, 'aralık': 12
-        }
-        month = month_map.get(month_str, 1)
-        return datetime(year, month, 1)
-    return None
-
-def process_page_chunk(file_path: str, page_indices: List[int]) -> Tuple[List[dict], Optional[datetime]]:
-    """Helper to process a set of pages in a separate process"""
-    local_records_data = []
+# Akış modunda her iş parçası bu kadar sayfa içerir
+STREAM_PAGES_PER_CHUNK = 1
+# Toplu ayrıştırmada boşta kalan işçinin çektiği sayfa sayısı
+PAGES_PER_TASK = 2
+# Her işçi süreçte açık tutulan belge sayısı; toplu ayrıştırmada işçiler dosyalar arasında gidip gelir
+MAX_OPEN_DOCUMENTS = 4
+# İşçilerin yükleme bırakıldı sayacına bakma aralığı (saniye)
+UPLOAD_RELEASE_POLL_SECONDS = 0.5
+
+# VALUE_FIELDS sırasıyla tablo sütunları
+# (maas, mesai, mesai_saati, ek, yardim, bes, avans, icra, borc, banka, kasa)
+ROW_COLUMNS = (7, 8, 6, 9, 10, 11, 12, 13, 14, 15, 16)
+
+class PageExtractionError(ValueError):
+    """Bir sayfa grubu okunamadı; dosyanın sonucu eksik kalacağından kaydedilmez ve önbelleğe yazılmaz"""
+
+    def __init__(self, pages: List[int], reason: str, filename: Optional[str] = None):
+        # İşçiden ana sürece taşınabilmesi için tüm alanlar args içinde tutulur
+        super().__init__(pages, reason, filename)
+        self.pages = pages
+        self.reason = reason
+        self.filename = filename
+
+    def __str__(self) -> str:
+        first, last = self.pages[0] + 1, self.pages[-1] + 1
+        span = f"{first}" if first == last else f"{first}-{last}"
+        prefix = f"{self.filename}: " if self.filename else ""
+        return f"{prefix}{span}. sayfa okunamadı ({self.reason})"
+
+class _OpenDocument:
+    """İşçi süreçte açık tutulan belge ve onu okuyan çıkarma motoru"""
+
+    def __init__(self, extractor: PdfExtractor, shm: Optional[SharedMemory] = None, reader: Optional[BinaryIO] = None,
+                 upload: bool = False):
+        self.extractor = extractor
+        self._shm = shm
+        self._reader = reader
+        # Yüklemeler istek bitince bırakılır; kalıcı yerel dosyalar önbellekte kalabilir
+        self.upload = upload
+
+    def close(self):
+        self.extractor.close()
+        if self._reader is not None:
+            self._reader.close()
+        if self._shm is not None:
+            self._shm.close()
+
+# İşçi süreç içinde dosya başına açık PDF tutamaçları
+_open_documents: "OrderedDict[tuple, _OpenDocument]" = OrderedDict()
+# İş parçası ile yükleme bırakma izleyicisi aynı anda belgelere dokunmaz
+_documents_lock = threading.RLock()
+
+def _open_local(path: str) -> BinaryIO:
+    """Dosyayı belleğe kopyalamadan açar; Windows'ta tutamaç açıkken de dosya silinebilir (FILE_SHARE_DELETE)"""
+    if sys.platform != "win32":
+        return open(path, "rb")
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    GENERIC_READ = 0x80000000
+    FILE_SHARE_ALL = 0x1 | 0x2 | 0x4  # READ | WRITE | DELETE
+    OPEN_EXISTING = 3
+    create_file = ctypes.windll.kernel32.CreateFileW
+    create_file.argtypes = [
+        wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+        wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE,
+    ]
+    create_file.restype = wintypes.HANDLE
+    handle = create_file(os.path.abspath(path), GENERIC_READ, FILE_SHARE_ALL, None, OPEN_EXISTING, 0, None)
+    if handle is None or handle == wintypes.HANDLE(-1).value:
+        raise ctypes.WinError()
+    fd = msvcrt.open_osfhandle(handle, os.O_RDONLY | os.O_BINARY)
+    return os.fdopen(fd, "rb")
+
+def _document_key(source: DocumentSource, engine: str) -> tuple:
+    if isinstance(source, SharedSource):
+        return (engine, "shm", source.name, source.digest)
+    stat = os.stat(source)
+    return (engine, os.path.abspath(source), stat.st_mtime_ns, stat.st_size)
+
+def _get_document(source: DocumentSource, engine: str, low_memory: bool = False) -> _OpenDocument:
+    """Worker-local cached handle; reopened only when the file or engine changes"""
+    key = _document_key(source, engine)
+    doc = _open_documents.get(key)
+    if doc is not None:
+        _open_documents.move_to_end(key)
+        return doc
+
+    # Düşük bellek modunda dosyalar tek tek işlenir; önceki belgenin önbellekleri tutulmaz
+    limit = 1 if low_memory else MAX_OPEN_DOCUMENTS
+    while len(_open_documents) >= limit:
+        _, old_doc = _open_documents.popitem(last=False)
+        old_doc.close()
+
+    extractor_cls = get_extractor(engine)
+    if isinstance(source, SharedSource):
+        # Yükleme ana süreçteki bölgeden kopyalanmadan okunur
+        shm = attach_shared(source)
+        reader = SharedReader(shm, source.size)
+        doc = _OpenDocument(extractor_cls(reader), shm, reader, upload=True)
+    else:
+        # Dosya her açılışta belleğe kopyalanmaz; sayfalar gerektikçe diskten okunur
+        stream = _open_local(source)
+        try:
+            doc = _OpenDocument(extractor_cls(stream), reader=stream, upload=is_upload(source))
+        except Exception:
+            stream.close()
+            raise
+    _open_documents[key] = doc
+    return doc
+
+def close_documents():
+    """İşçide çalışır; açık belgeler ve önbellekleri bırakılır"""
+    while _open_documents:
+        _, doc = _open_documents.popitem(last=False)
+        doc.close()
+    gc.collect()
+
+def close_upload_documents():
+    """İşçide çalışır; yüklemelerden açılmış belgeler kapatılır, kalıcı yerel dosyalar açık kalır"""
+    for key in [key for key, doc in _open_documents.items() if doc.upload]:
+        _open_documents.pop(key).close()
+
+def watch_upload_releases(releases):
+    """İşçi başlarken çağrılır: bir yükleme bırakılınca açık yükleme belgeleri işçi boştayken de kapatılır.
+
+    Bölge/geçici dosya işçide açık kaldıkça silinse de bellek ve disk geri dönmez.
+    """
+    def watch():
+        seen = releases.value
+        while True:
+            time.sleep(UPLOAD_RELEASE_POLL_SECONDS)
+            if releases.value == seen:
+                continue
+            seen = releases.value
+            with _documents_lock:
+                close_upload_documents()
+
+    threading.Thread(target=watch, name="upload-release", daemon=True).start()
+
+def document_page_count(source: DocumentSource, engine: str, low_memory: bool = False) -> int:
+    """İşçide çalışır; belgeyi açık belge önbelleğine de alır"""
+    with _documents_lock:
+        return _get_document(source, engine, low_memory).extractor.page_count
+
+def process_page_chunk(
+    source: DocumentSource,
+    page_indices: List[int],
+    engine: Optional[str] = None,
+    low_memory: bool = False,
+    memory_limit: int = 0
+) -> Tuple[PayrollBatch, List[float], int]:
+    """Helper to process a set of pages in a separate process; also returns per-page durations and worker RSS.
+
+    low_memory ve memory_limit (bayt, 0: sınırsız) motor gibi ana süreçte belirlenir.
+    """
+    with _documents_lock:
+        return _extract_chunk(source, page_indices, engine, low_memory, memory_limit)
+
+def _extract_chunk(
+    source: DocumentSource, page_indices: List[int], engine: Optional[str], low_memory: bool, memory_limit: int
+) -> Tuple[PayrollBatch, List[float], int]:
+    batch = PayrollBatch()
     found_period = None
+    page_times = []
     
-    # Table settings for speed and accuracy
-    table_settings = {
-        "vertical_strategy": "lines",
-        "horizontal_strategy": "lines",
-        "snap_tolerance": 3,
-        "join_tolerance": 3,
-    }
-
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for idx in page_indices:
-                page = pdf.pages[idx]
+        # Motor ana süreçte seçilir; işçiler kendi ortam değişkenlerine bakmaz
+        extractor = _get_document(source, engine or settings.PDF_EXTRACTOR, low_memory).extractor
+        for idx in page_indices:
+            page_start = time.perf_counter()
+            
+            # Only extract period from first encountered text with it
+            rows, period = extractor.extract_page(idx, need_period=not found_period)
+            if period:
+                found_period = period
+            
+            for row in rows:
+                if not row or len(row) < 17:
+                    continue
                 
-                # Only extract period from first encountered text with it
-                if not found_period:
-                    text = page.extract_text()
-                    found_period = extract_period(text)
+                if row[0] == 'TOPLAM' or not row[0] or not str(row[0]).isdigit():
+                    continue
                 
-                tables = page.extract_tables(table_settings)
-                for table in tables:
-                    for row in table:
-                        if not row or len(row) < 17:
-                            continue
-                        
-                        if row[0] == 'TOPLAM' or not row[0] or not str(row[0]).isdigit():
-                            continue
-                        
-                        # Store as dict for easier pickling back to main process
-                        rec_dict = {
-                            "personel_ad": row[1],
-                            "maas": clean_currency(row[7]),
-                            "mesai": clean_currency(row[8]),
-                            "mesai_saati": clean_currency(row[6]),
-                            "ek": clean_currency(row[9]),
-                            "yardim": clean_currency(row[10]),
-                            "bes": clean_currency(row[11]),
-                            "avans": clean_currency(row[12]),
-                            "icra": clean_currency(row[13]),
-                            "borc": clean_currency(row[14]),
-                            "banka": clean_currency(row[15]),
-                            "kasa": clean_currency(row[16])
-                        }
-                        local_records_data.append(rec_dict)
+                # Satır başına sözlük yerine sütun dizileri; ana sürece ham bayt olarak döner
+                batch.append(row[1], [clean_currency(row[i]) for i in ROW_COLUMNS])
+            # Tutamaç açık kalır ama sayfanın düzen önbellekleri satırlar çıkarılır çıkarılmaz bırakılır
+            extractor.release_pages([idx])
+            if low_memory:
+                extractor.trim()
+            page_times.append(time.perf_counter() - page_start)
     except Exception as e:
-        print(f"Error processing pages {page_indices}: {e}")
-        
-    return local_records_data, found_period
+        # Eksik parti sessizce dönmez; belge bozulmuş olabileceğinden açık tutamaçlar da bırakılır
+        close_documents()
+        raise PageExtractionError(page_indices, f"{type(e).__name__}: {e}") from e
+
+    rss = worker_pool.current_rss()
+    if low_memory and memory_limit and rss > memory_limit:
+        # Tavan aşıldı: belge bir sonraki parçada yeniden açılır; ana süreç eşzamanlılığı da azaltır
+        close_documents()
+
+    batch.period = found_period.date() if found_period else None
+    return batch, page_times, rss
 
-def parse_payroll_pdf(file_path: str) -> List[PayrollRecord]:
-    """Parse PDF using multiprocessing for speed"""
-    all_records = []
+def resolve_period(batch: PayrollBatch) -> PayrollBatch:
+    """Dönem başlığı bulunamadıysa bu ay varsayılır"""
+    if batch.period is None:
+        batch.period = datetime.now().date()
+    return batch
+
+def count_pages(source: DocumentSource, engine: Optional[str] = None, low_memory: bool = False) -> int:
+    engine = engine or settings.PDF_EXTRACTOR
+    if isinstance(source, SharedSource):
+        # Paylaşımlı bölgeye ana süreçte ikinci kez bağlanılmaz; ilk işçi belgeyi açık tutar
+        return worker_pool.submit(document_page_count, source, engine, low_memory).result()
+    with open(source, "rb") as f:
+        extractor = get_extractor(engine)(f)
+        try:
+            return extractor.page_count
+        finally:
+            extractor.close()
+
+def read_period(file_path: str, engine: Optional[str] = None) -> Optional[date]:
+    """İlk sayfa başlığındaki dönem; tablolar okunmadan, dosyaları kronolojik sıralamak için"""
+    with open(file_path, "rb") as f:
+        extractor = get_extractor(engine or settings.PDF_EXTRACTOR)(f)
+        try:
+            if not extractor.page_count:
+                return None
+            period = extractor.page_period(0)
+            return period.date() if period else None
+        finally:
+            extractor.close()
+
+def cache_key(digest: str, engine: str) -> str:
+    """Ayrıştırma önbelleği anahtarı; motorlar birbirinin sonucunu kullanmaz"""
+    return f"{engine}:{digest}"
+
+def _submit_all(
+    source: DocumentSource, chunks: List[List[int]], engine: str
+) -> Iterator[Tuple[List[int], PayrollBatch, List[float]]]:
+    """Tüm parçalar baştan havuza verilir; boşta kalan işçi sıradakini çeker"""
+    futures = {worker_pool.submit(process_page_chunk, source, chunk, engine): chunk for chunk in chunks}
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            batch, page_times, _ = future.result()
+            yield futures[future], batch, page_times
+    finally:
+        # İstemci bağlantıyı kapatır veya iş iptal edilirse bu dosyanın bekleyen sayfaları iptal edilir
+        for future in futures:
+            future.cancel()
+
+def _submit_bounded(
+    source: DocumentSource, chunks: List[List[int]], engine: str
+) -> Iterator[Tuple[List[int], PayrollBatch, List[float]]]:
+    """Düşük bellek modu: aynı anda en fazla işçi sayısı kadar parça verilir, sonuçlar tüketildikçe yenisi gelir.
+
+    Bir işçi WORKER_MEMORY_LIMIT_MB tavanını aşarsa aynı anda çalışan parça sayısı bir azaltılır (en az 1).
+    """
+    limit = settings.WORKER_MEMORY_LIMIT_MB * 1024 * 1024
+    in_flight = worker_pool.pool_size()
+    remaining = iter(chunks)
+    futures: Dict[concurrent.futures.Future, List[int]] = {}
+    try:
+        while True:
+            while len(futures) < in_flight:
+                chunk = next(remaining, None)
+                if chunk is None:
+                    break
+                futures[worker_pool.submit(process_page_chunk, source, chunk, engine, True, limit)] = chunk
+            if not futures:
+                return
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                chunk = futures.pop(future)
+                batch, page_times, rss = future.result()
+                if limit and rss > limit:
+                    metrics.inc("worker_memory_limit_hits_total")
+                    in_flight = max(1, in_flight - 1)
+                yield chunk, batch, page_times
+    finally:
+        for future in futures:
+            future.cancel()
+
+def page_chunks(num_pages: int, pages_per_chunk: int) -> List[List[int]]:
+    return [list(range(i, min(i + pages_per_chunk, num_pages))) for i in range(0, num_pages, pages_per_chunk)]
+
+def parse_payroll_pdf(source: DocumentSource, digest: Optional[str] = None) -> PayrollBatch:
+    """Parse PDF using the shared worker pool for speed"""
+    batches = list(iter_payroll_pdf(source, pages_per_chunk=PAGES_PER_TASK, digest=digest))
+    if len(batches) == 1:
+        return batches[0][0]
+    period = batches[0][0].period if batches else None
+    return PayrollBatch.concat((batch for batch, _, _ in batches), period)
+
+def iter_payroll_pdf(
+    source: DocumentSource,
+    pages_per_chunk: int = STREAM_PAGES_PER_CHUNK,
+    cancel_event: Optional[threading.Event] = None,
+    digest: Optional[str] = None
+) -> Iterator[Tuple[PayrollBatch, int, int]]:
+    """Yield (batch, pages_done, num_pages) as each page chunk finishes.
+
+    Bir sayfa grubu okunamazsa PageExtractionError yükselir; sonuç önbelleğe yazılmaz.
+    """
+    engine = settings.PDF_EXTRACTOR
+    low_memory = settings.LOW_MEMORY_MODE
+    # Aynı içerik daha önce ayrıştırıldıysa tek parça halinde önbellekten döner;
+    # düşük bellek modunda dosyanın tamamı tek partide tutulmaz, önbellek kullanılmaz
+    cache = None if low_memory else get_parse_cache()
+    if cache and digest is None:
+        # Yüklemelerde özet veri gelirken hesaplanmıştır
+        digest = file_digest(source)
+    if cache:
+        cached = cache.get(cache_key(digest, engine))
+        if cached is not None:
+            metrics.inc("parse_cache_hits_total")
+            batch, num_pages = cached
+            yield resolve_period(batch), num_pages, num_pages
+            return
+        metrics.inc("parse_cache_misses_total")
+
+    num_pages = count_pages(source, engine, low_memory)
+    if num_pages == 0:
+        return
+
+    # Dönem işçilerden gelir; sayfanın karakterleri tablo çıkarımında yeniden kullanıldığı için ucuzdur
     final_period = None
-    
-    with pdfplumber.open(file_path) as pdf:
-        num_pages = len(pdf.pages)
-        if num_pages == 0:
-            return []
-
-    # Chunk pages based on CPU count
-    cpu_count = min(os.cpu_count() or 1, num_pages)
-    chunk_size = (num_pages + cpu_count - 1) // cpu_count
-    chunks = [list(range(i, min(i + chunk_size, num_pages))) for i in range(0, num_pages, chunk_size)]
-
-    # Use ProcessPoolExecutor for true parallelism
-    with concurrent.futures.ProcessPoolExecutor(max_workers=cpu_count) as executor:
-        futures = [executor.submit(process_page_chunk, file_path, chunk) for chunk in chunks]
-        
+
+    chunks = page_chunks(num_pages, pages_per_chunk)
+
+    # Küçük sayfa grupları paylaşılan havuza sırayla verilir
+    submit = _submit_bounded if low_memory else _submit_all
+    results = submit(source, chunks, engine)
+    try:
+        pages_done = 0
+        # Dönem bulunana kadar sonuçlar bekletilir
+        pending: List[PayrollBatch] = []
+        all_batches: List[PayrollBatch] = []
+        for chunk, batch, page_times in results:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            record_pages(page_times, len(batch))
+            pages_done += len(chunk)
+            if batch.period and not final_period:
+                final_period = batch.period
+            pending.append(batch)
+            if cache:
+                all_batches.append(batch)
+            if final_period or pages_done == num_pages:
+                out = pending[0] if len(pending) == 1 else PayrollBatch.concat(pending)
+                out.period = final_period
+                yield resolve_period(out), pages_done, num_pages
+                pending = []
+
+        # Buraya yalnızca tüm parçaları okunmuş dosyalar ulaşır
+        if cache and any(all_batches):
+            cache.put(cache_key(digest, engine), PayrollBatch.concat(all_batches, final_period), num_pages)
+    finally:
+        results.close()
+
+def parse_payroll_pdfs(file_paths: List[str]) -> List[Tuple[str, PayrollBatch]]:
+    """Birden çok PDF'in sayfalarını tek ortak kuyrukta ayrıştırır; sonuçlar dosya sırasıyla döner.
+
+    Herhangi bir dosyanın bir sayfa grubu okunamazsa dosya adıyla PageExtractionError yükselir.
+    """
+    engine = settings.PDF_EXTRACTOR
+    cache = get_parse_cache()
+    keys: List[Optional[str]] = [None] * len(file_paths)
+    cached: Dict[int, PayrollBatch] = {}
+    # Dosya başına sayfa sırasıyla parça sonuçları
+    chunk_results: Dict[int, list] = {}
+    page_counts: Dict[int, int] = {}
+
+    futures = {}
+    try:
+        for i, file_path in enumerate(file_paths):
+            if cache:
+                keys[i] = cache_key(file_digest(file_path), engine)
+                hit = cache.get(keys[i])
+                if hit is not None:
+                    metrics.inc("parse_cache_hits_total")
+                    cached[i] = hit[0]
+                    continue
+                metrics.inc("parse_cache_misses_total")
+
+            page_counts[i] = count_pages(file_path, engine)
+            chunks = page_chunks(page_counts[i], PAGES_PER_TASK)
+            chunk_results[i] = [None] * len(chunks)
+            # Parçalar dosya dosya kuyruğa girer; işçi bir dosyayı bitirince sıradakine geçer,
+            # böylece çekirdekler dosya sınırlarında boşta kalmaz ve açık belge önbelleği korunur
+            for j, chunk in enumerate(chunks):
+                futures[worker_pool.submit(process_page_chunk, file_path, chunk, engine)] = (i, j)
+
         for future in concurrent.futures.as_completed(futures):
-            recs_data, period = future.result()
-            if period and not final_period:
-                final_period = period
-            
-            # Convert dicts back to PayrollRecord objects
-            for data in recs_data:
-                record = PayrollRecord(
-                    personel_ad=data["personel_ad"],
-                    donem=final_period.date() if final_period else datetime.now().date(),
-                    maas=data["maas"],
-                    mesai=data["mesai"],
-                    mesai_saati=data["mesai_saati"],
-                    ek=data["ek"],
-                    yardim=data["yardim"],
-                    bes=data["bes"],
-                    avans=data["avans"],
-                    icra=data["icra"],
-                    borc=data["borc"],
-                    banka=data["banka"],
-                    kasa=data["kasa"]
-                )
-                all_records.append(record)
-
-    # Correct the period for all records if it was found late
-    if final_period:
-        for r in all_records:
-            r.donem = final_period.date()
-
-    return all_records
+            i, j = futures[future]
+            try:
+                batch, page_times, _ = future.result()
+            except PageExtractionError as e:
+                raise PageExtractionError(e.pages, e.reason, os.path.basename(file_paths[i])) from None
+            record_pages(page_times, len(batch))
+            chunk_results[i][j] = batch
+    finally:
+        for future in futures:
+            future.cancel()
+
+    results = []
+    for i, file_path in enumerate(file_paths):
+        if i in cached:
+            batch = cached[i]
+        else:
+            period = next((b.period for b in chunk_results[i] if b.period), None)
+            batch = PayrollBatch.concat(chunk_results[i], period)
+            if cache and batch:
+                cache.put(keys[i], batch, page_counts[i])
+        results.append((file_path, resolve_period(batch)))
+    return results
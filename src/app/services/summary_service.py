@@ -0,0 +1,160 @@
+from typing import Any, Dict, Iterable, List, Optional
+from src.app.db.models import PayrollRecord, PayrollAnomaly
+from src.app.core.config import settings
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case, and_, true
+from sqlalchemy.orm import aliased
+from datetime import date
+
+# Dönem başına saklanan en yüksek artış sayısı; istekteki top bundan büyük olamaz
+MAX_TOP_INCREASES = 50
+
+# Mesai saati dağılımı: (etiket, üst sınır dahil); sonuncusu sınır aşımı
+OVERTIME_BUCKETS = (
+    ("0", 0.0), ("0-10", 10.0), ("10-20", 20.0), ("20-30", 30.0),
+    (f"30-{settings.RULE_OVERTIME_LIMIT:g}", settings.RULE_OVERTIME_LIMIT)
+)
+OVERTIME_OVER_LIMIT = f"{settings.RULE_OVERTIME_LIMIT:g}+"
+
+def _kazanc(record) -> Any:
+    return record.maas + record.mesai + record.ek + record.yardim
+
+def _empty_period(donem: date) -> Dict[str, Any]:
+    return {
+        "donem": donem.strftime("%Y-%m"),
+        "records": 0,
+        "toplam_kazanc": 0.0,
+        "toplam_kesinti": 0.0,
+        "toplam_odeme": 0.0,
+        "anomaly_records": 0,
+        "anomalies_by_category": {},
+        "overtime_distribution": dict.fromkeys([label for label, _ in OVERTIME_BUCKETS] + [OVERTIME_OVER_LIMIT], 0),
+        "top_increases": [],
+    }
+
+async def compute_period_summaries(db: AsyncSession, periods: List[date]) -> Dict[date, Dict[str, Any]]:
+    """Verilen dönemlerin özetleri; her bölüm tek GROUP BY sorgusuyla, ORM nesnesi yüklenmeden"""
+    summaries = {d: _empty_period(d) for d in periods}
+    if not periods:
+        return summaries
+    r = PayrollRecord
+
+    totals = select(
+        r.donem, func.count(),
+        func.sum(_kazanc(r)),
+        func.sum(r.bes + r.avans + r.icra + r.borc),
+        func.sum(r.banka + r.kasa),
+    ).where(r.donem.in_(periods)).group_by(r.donem)
+    for donem, count, kazanc, kesinti, odeme in await db.execute(totals):
+        s = summaries[donem]
+        s["records"] = count
+        s["toplam_kazanc"], s["toplam_kesinti"], s["toplam_odeme"] = kazanc or 0.0, kesinti or 0.0, odeme or 0.0
+
+    anomaly_counts = select(PayrollAnomaly.donem, func.count()).where(
+        PayrollAnomaly.donem.in_(periods)
+    ).group_by(PayrollAnomaly.donem)
+    for donem, count in await db.execute(anomaly_counts):
+        summaries[donem]["anomaly_records"] = count
+
+    values = func.json_each(PayrollAnomaly.categories).table_valued("value")
+    categories = select(PayrollAnomaly.donem, values.c.value, func.count()).select_from(
+        PayrollAnomaly
+    ).join(values, true()).where(PayrollAnomaly.donem.in_(periods)).group_by(PayrollAnomaly.donem, values.c.value)
+    for donem, category, count in await db.execute(categories):
+        summaries[donem]["anomalies_by_category"][category] = count
+
+    bucket = case(
+        *((r.mesai_saati <= upper, label) for label, upper in OVERTIME_BUCKETS),
+        else_=OVERTIME_OVER_LIMIT
+    )
+    overtime = select(r.donem, bucket, func.count()).where(r.donem.in_(periods)).group_by(r.donem, bucket)
+    for donem, label, count in await db.execute(overtime):
+        summaries[donem]["overtime_distribution"][label] = count
+
+    # Artış kuralıyla aynı tanım: önceki takvim ayının toplam kazancına göre oran
+    prev = aliased(PayrollRecord)
+    current_total = _kazanc(r)
+    prev_total = _kazanc(prev)
+    increase = (current_total - prev_total) / prev_total
+    ranked = select(
+        r.donem.label("donem"), r.personel_ad.label("personel_ad"),
+        prev_total.label("prev_total"), current_total.label("current_total"), increase.label("increase"),
+        func.row_number().over(partition_by=r.donem, order_by=increase.desc()).label("rank")
+    ).join(
+        prev, and_(prev.personel_ad == r.personel_ad, prev.donem == func.date(r.donem, "-1 month"))
+    ).where(r.donem.in_(periods), prev_total > 0, current_total > prev_total).subquery()
+    top = select(
+        ranked.c.donem, ranked.c.personel_ad, ranked.c.prev_total, ranked.c.current_total, ranked.c.increase
+    ).where(ranked.c.rank <= MAX_TOP_INCREASES).order_by(ranked.c.donem, ranked.c.rank)
+    for donem, name, prev_value, current_value, ratio in await db.execute(top):
+        summaries[donem]["top_increases"].append({
+            "personel_ad": name,
+            "donem": donem.strftime("%Y-%m"),
+            "prev_total": prev_value,
+            "current_total": current_value,
+            "increase_pct": ratio * 100,
+        })
+    return summaries
+
+def combine_summaries(summaries: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    """Dönem özetlerinden seçilen aralığın genel toplamı"""
+    overall = {
+        "records": 0, "toplam_kazanc": 0.0, "toplam_kesinti": 0.0, "toplam_odeme": 0.0, "anomaly_records": 0,
+        "anomalies_by_category": {}, "overtime_distribution": {}, "top_increases": [],
+    }
+    for s in summaries:
+        for key in ("records", "toplam_kazanc", "toplam_kesinti", "toplam_odeme", "anomaly_records"):
+            overall[key] += s[key]
+        for key in ("anomalies_by_category", "overtime_distribution"):
+            for label, count in s[key].items():
+                overall[key][label] = overall[key].get(label, 0) + count
+        overall["top_increases"].extend(s["top_increases"][:top])
+    overall["top_increases"].sort(key=lambda item: item["increase_pct"], reverse=True)
+    del overall["top_increases"][top:]
+    return overall
+
+class SummaryCache:
+    """Dönem başına özet önbelleği; yalnızca o dönem yeniden işlendiğinde veya veriler silindiğinde geçersizleşir"""
+
+    def __init__(self):
+        self._periods: Optional[List[date]] = None
+        self._summaries: Dict[date, Dict[str, Any]] = {}
+        # Hesaplama sürerken gelen geçersizleştirmeden sonra eski sonuç yazılmasın
+        self._generation = 0
+
+    def invalidate(self, periods: Iterable[date]):
+        """periods: yeniden yazılan (veritabanında var olan) dönemler; dönem listesi yeniden taranmaz"""
+        periods = set(periods)
+        self._generation += 1
+        if self._periods is not None:
+            self._periods = sorted(periods.union(self._periods))
+        for donem in periods:
+            self._summaries.pop(donem, None)
+
+    def clear(self):
+        self._generation += 1
+        self._periods = None
+        self._summaries.clear()
+
+    async def get(self, db: AsyncSession, donem_from: Optional[date] = None, donem_to: Optional[date] = None) -> List[Dict[str, Any]]:
+        generation = self._generation
+        periods = self._periods
+        if periods is None:
+            periods = list((await db.execute(select(PayrollRecord.donem).distinct().order_by(PayrollRecord.donem))).scalars())
+            if generation == self._generation:
+                self._periods = periods
+
+        selected = [
+            d for d in periods
+            if (donem_from is None or d >= donem_from) and (donem_to is None or d <= donem_to)
+        ]
+        found = {d: self._summaries[d] for d in selected if d in self._summaries}
+        missing = [d for d in selected if d not in found]
+        if missing:
+            computed = await compute_period_summaries(db, missing)
+            if generation == self._generation:
+                self._summaries.update(computed)
+            found.update(computed)
+        return [found[d] for d in selected]
+
+summary_cache = SummaryCache()
@@ -0,0 +1,154 @@
+from typing import TYPE_CHECKING, NamedTuple, Optional, Union
+from multiprocessing.shared_memory import SharedMemory
+from src.app.core.config import settings
+from src.app.services.parse_cache import HASH_BLOCK_SIZE
+from src.app.services import worker_pool
+import hashlib
+import io
+import os
+import sys
+import tempfile
+
+if TYPE_CHECKING:
+    # İşçi süreçler bu modülü içe aktarır; web katmanını yüklemesinler
+    from fastapi import UploadFile
+
+class SharedSource(NamedTuple):
+    """İşçi süreçlerin ada göre bağlandığı paylaşımlı bellek bölgesi"""
+    name: str
+    size: int
+    # İşçideki açık belge önbelleği için anahtar; bölge adları yeniden kullanılabilir
+    digest: str
+
+class SpoolPath(str):
+    """Büyük yüklemenin geçici dosyası; istek bitince silinir"""
+
+# İşçilere verilen belge kaynağı: dosya yolu veya paylaşımlı bellek
+DocumentSource = Union[str, SharedSource]
+
+def is_upload(source: DocumentSource) -> bool:
+    """Yüklemeler istekten sonra serbest bırakılır; işçiler bunları yalnızca istek süresince açık tutar"""
+    return isinstance(source, (SharedSource, SpoolPath))
+
+class UploadBuffer:
+    """Yüklenen PDF'in tek kopyası ve akış sırasında hesaplanan SHA-256 özeti"""
+
+    def __init__(self, source: DocumentSource, digest: str, size: int,
+                 shm: Optional[SharedMemory] = None, spool_path: Optional[str] = None):
+        self.source = source
+        self.digest = digest
+        self.size = size
+        self._shm = shm
+        self._spool_path = spool_path
+
+    def close(self):
+        """Bölgeyi/dosyayı serbest bırakır; işçiler de açık tuttukları yükleme belgelerini kapatır"""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        if self._spool_path is not None:
+            try:
+                os.remove(self._spool_path)
+            except OSError:
+                pass
+            self._spool_path = None
+        worker_pool.release_uploads()
+
+async def _upload_size(upload: "UploadFile") -> int:
+    if upload.size is not None:
+        return upload.size
+    await upload.seek(0, os.SEEK_END)
+    size = upload.file.tell()
+    await upload.seek(0)
+    return size
+
+async def receive_upload(upload: "UploadFile", spool_threshold: Optional[int] = None) -> UploadBuffer:
+    """Yüklemeyi bir kez okur: eşiğe kadar paylaşımlı belleğe, üstünde geçici dosyaya yazar"""
+    if spool_threshold is None:
+        spool_threshold = settings.UPLOAD_SPOOL_THRESHOLD
+    size = await _upload_size(upload)
+    h = hashlib.sha256()
+
+    if size <= spool_threshold:
+        shm = SharedMemory(create=True, size=max(size, 1))
+        offset = 0
+        try:
+            while True:
+                chunk = await upload.read(HASH_BLOCK_SIZE)
+                if not chunk:
+                    break
+                shm.buf[offset:offset + len(chunk)] = chunk
+                h.update(chunk)
+                offset += len(chunk)
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        digest = h.hexdigest()
+        return UploadBuffer(SharedSource(shm.name, offset, digest), digest, offset, shm=shm)
+
+    # Çok büyük dosyalar belleği doldurmasın diye diske yazılır
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await upload.read(HASH_BLOCK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                h.update(chunk)
+                written += len(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return UploadBuffer(SpoolPath(path), h.hexdigest(), written, spool_path=path)
+
+def attach_shared(source: SharedSource) -> SharedMemory:
+    """İşçi süreçte bölgeye bağlanır; bölgenin sahibi ana süreç olduğundan izleyiciye kaydedilmez"""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=source.name, track=False)
+    from multiprocessing import resource_tracker
+    # 3.13 öncesinde bağlanan süreç de kayıt yapar ve çıkışta bölgeyi siler (bpo-39959)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return SharedMemory(name=source.name)
+    finally:
+        resource_tracker.register = register
+
+class SharedReader(io.RawIOBase):
+    """Paylaşımlı bellek üzerinde kopyasız, salt okunur dosya nesnesi"""
+
+    def __init__(self, shm: SharedMemory, size: int):
+        self._view = shm.buf[:size]
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
@@ -0,0 +1,118 @@
+from typing import Any, Dict, Optional, Tuple
+from src.app.services.anomaly_engine import (
+    HISTORY_METRICS, OUTLIER_ISSUES, OUTLIER_WINDOW, RuleThresholds, history_stats, month_index
+)
+from src.app.services.history_index import history_index
+from sqlalchemy.ext.asyncio import AsyncSession
+from numpy.lib.stride_tricks import sliding_window_view
+from datetime import date
+import numpy as np
+
+RULES = ("balance", "increase", "overtime", "history")
+
+def _month_label(index: int) -> str:
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+class WhatIfSnapshot:
+    """Geçmiş dizininin (personel x ay) üzerinde eşiklerden bağımsız ara sonuçlar.
+
+    Dizin değişince bir kez yeniden hesaplanır; eşik taraması yalnızca karşılaştırmalardan oluşur,
+    PDF ayrıştırılmaz ve veritabanı sorgulanmaz.
+    """
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._stats: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def _prepare(self):
+        if self._version == history_index.version:
+            return
+        data, base_month = history_index.snapshot()
+        kazanc, kesinti, saat, odeme = data
+        self.base_month = base_month
+        self.present = ~np.isnan(kazanc)
+        self.history_values = data[:len(HISTORY_METRICS)]
+        self.saat = saat
+        with np.errstate(invalid="ignore"):
+            self.abs_diff = np.abs(kazanc - (kesinti + odeme))
+            # Önceki takvim ayının toplam kazancı; ilk ayda yok
+            prev = np.full_like(kazanc, np.nan)
+            prev[:, 1:] = kazanc[:, :-1]
+            has_prev = prev > 0
+            self.increase = np.where(has_prev, (kazanc - prev) / np.where(has_prev, prev, 1.0), -np.inf)
+        self._stats = {}
+        self._version = history_index.version
+
+    def _history(self, method: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Her hücre için kendinden önceki OUTLIER_WINDOW ayın (merkez, yayılım, dolu ay sayısı)"""
+        if method not in self._stats:
+            values = self.history_values
+            padded = np.concatenate(
+                [np.full(values.shape[:2] + (OUTLIER_WINDOW,), np.nan), values], axis=2
+            )
+            windows = sliding_window_view(padded, OUTLIER_WINDOW, axis=2)[:, :, :values.shape[2]]
+            self._stats[method] = history_stats(windows, method)
+        return self._stats[method]
+
+    def evaluate(self, t: RuleThresholds, donem_from: Optional[date] = None, donem_to: Optional[date] = None) -> Dict[str, Any]:
+        """Verilen eşiklerle kural bazında, kategori bazında ve dönem bazında anomali sayıları"""
+        self._prepare()
+        months = self.present.shape[1]
+        if self.base_month is None or months == 0:
+            return {"records": 0, "anomaly_records": 0, "by_rule": dict.fromkeys(RULES, 0),
+                    "by_category": {}, "by_period": []}
+
+        # Seçilen aralığın sütunları
+        first = 0 if donem_from is None else max(0, month_index(donem_from) - self.base_month)
+        last = months if donem_to is None else min(months, month_index(donem_to) - self.base_month + 1)
+        columns = slice(first, max(first, last))
+        present = self.present[:, columns]
+
+        with np.errstate(invalid="ignore"):
+            fail = {
+                "balance": ~(self.abs_diff[:, columns] <= t.balance_tolerance),
+                "increase": self.increase[:, columns] > t.increase_limit,
+                "overtime": ~(self.saat[:, columns] <= t.overtime_limit),
+            }
+            center, spread, count = self._history(t.outlier_method)
+            metric_flags = (count[:, :, columns] >= t.outlier_min_history) & (
+                np.abs(self.history_values[:, :, columns] - center[:, :, columns]) > t.outlier_k * spread[:, :, columns]
+            )
+        fail["history"] = metric_flags.any(axis=0)
+        for rule in fail:
+            fail[rule] &= present
+
+        # Kural -> kategori eşlemesi evaluate_rows ile aynı
+        by_category = {"maaş": fail["balance"] | fail["increase"], "mesai": fail["overtime"].copy()}
+        for m, metric in enumerate(HISTORY_METRICS):
+            by_category[OUTLIER_ISSUES[metric][0]] |= metric_flags[m] & present
+
+        anomalous = fail["balance"] | fail["increase"] | fail["overtime"] | fail["history"]
+        per_month_records = present.sum(axis=0)
+        per_month_anomalies = anomalous.sum(axis=0)
+        return {
+            "records": int(per_month_records.sum()),
+            "anomaly_records": int(per_month_anomalies.sum()),
+            "by_rule": {rule: int(flags.sum()) for rule, flags in fail.items()},
+            "by_category": {category: int(flags.sum()) for category, flags in by_category.items()},
+            "by_period": [
+                {"donem": _month_label(self.base_month + first + i), "records": int(n), "anomaly_records": int(a)}
+                for i, (n, a) in enumerate(zip(per_month_records.tolist(), per_month_anomalies.tolist()))
+                if n
+            ],
+        }
+
+    async def run(
+        self, db: AsyncSession, thresholds: RuleThresholds,
+        donem_from: Optional[date] = None, donem_to: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Sonuç ve Settings eşikleriyle (kaydedilen anomalilerle aynı) karşılaştırma"""
+        # Dizin oturumda ilk kez kullanılıyorsa tek sorguyla yüklenir; sonrasında yüklemelerle güncel kalır
+        await history_index.ensure_loaded(db)
+        return {
+            "thresholds": thresholds._asdict(),
+            "result": self.evaluate(thresholds, donem_from, donem_to),
+            "baseline": self.evaluate(RuleThresholds.from_settings(), donem_from, donem_to),
+        }
+
+what_if_snapshot = WhatIfSnapshot()
@@ -0,0 +1,108 @@
+from typing import Optional
+from src.app.core.config import settings
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import sys
+import threading
+
+_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_lock = threading.Lock()
+# Her yükleme bırakıldığında artan sayaç; işçiler değiştiğini görünce yükleme belgelerini kapatır
+_upload_releases = None
+
+def _warm_up() -> int:
+    """Seçili PDF motorunun ağır modüllerini işçi süreçte önceden yükler"""
+    from src.app.services.pdf_extractors import get_extractor
+    get_extractor(settings.PDF_EXTRACTOR).preload()
+    return os.getpid()
+
+def _init_worker(releases):
+    from src.app.services.pdf_service import watch_upload_releases
+    watch_upload_releases(releases)
+
+def release_uploads():
+    """Ana süreçte: bir yüklemenin bölgesi/geçici dosyası silindi, işçilerde açık kalmasın"""
+    if _upload_releases is not None:
+        with _upload_releases.get_lock():
+            _upload_releases.value += 1
+
+def current_rss() -> int:
+    """Bu sürecin fiziksel bellek kullanımı (bayt); ölçülemezse 0"""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return 0
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def pool_size() -> int:
+    return settings.PARSE_WORKERS or os.cpu_count() or 1
+
+def start_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Uygulama ömrü boyunca yaşayan işçi havuzunu başlatır ve ısıtır"""
+    global _executor, _upload_releases
+    with _lock:
+        if _executor is None or getattr(_executor, "_broken", False):
+            workers = pool_size()
+            if _upload_releases is None:
+                _upload_releases = multiprocessing.Value("Q", 0)
+            _executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(_upload_releases,)
+            )
+            # Her işçiye bir ısınma görevi; sonuç beklenmez
+            for _ in range(workers):
+                _executor.submit(_warm_up)
+        return _executor
+
+def get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Çalışan havuzu döner; başlatılmamış veya çökmüşse yeniden kurar"""
+    executor = _executor
+    if executor is None or getattr(executor, "_broken", False):
+        return start_pool()
+    return executor
+
+def submit(fn, *args, **kwargs) -> concurrent.futures.Future:
+    try:
+        return get_pool().submit(fn, *args, **kwargs)
+    except BrokenProcessPool:
+        # Bir işçi beklenmedik şekilde öldüyse havuz bir kez yenilenir
+        return start_pool().submit(fn, *args, **kwargs)
+
+def prewarm():
+    """Sunucu dinlemeye başladıktan sonra arka planda: PDF modülleri ve işçi havuzu hazırlanır"""
+    from src.app.core.metrics import metrics
+    import src.app.services.pdf_service  # noqa: F401
+    start_pool()
+    metrics.mark_startup("prewarm")
+
+def start_prewarm() -> threading.Thread:
+    thread = threading.Thread(target=prewarm, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+def shutdown_pool():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
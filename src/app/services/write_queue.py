@@ -0,0 +1,194 @@
+from typing import Dict, Iterable, List, Optional, Set
+from src.app.core.config import settings
+from src.app.core.metrics import metrics, stage
+from src.app.db.bulk import delete_stale_rows, upsert_batch
+from src.app.db.session import SessionLocal
+from src.app.services.anomaly_service import AnomalyService
+from src.app.services.history_index import history_index
+from src.app.services.payroll_batch import PayrollBatch
+from src.app.services.summary_service import summary_cache
+from datetime import date
+import asyncio
+import contextvars
+
+class WriteRequest:
+    """Tek yüklemenin kaydedilecek partileri ve anomalileri yeniden hesaplanacak dönemler; yazıldığında future tamamlanır.
+
+    replace: dönem -> o dönemde kalacak personel; dönemin diğer kayıtları aynı işlemde silinir
+    (varsayılan: partilerin dönemleri ve isimleri, yani yüklenen dosya dönemin tamamıdır).
+    """
+
+    def __init__(
+        self,
+        batches: List[PayrollBatch],
+        refresh: Optional[Iterable[date]] = None,
+        replace: Optional[Dict[date, Set[str]]] = None
+    ):
+        self.batches = batches
+        self.refresh: Set[date] = set(refresh) if refresh is not None else {batch.period for batch in batches}
+        if replace is None:
+            replace = {}
+            for batch in batches:
+                replace.setdefault(batch.period, set()).update(batch.names)
+        self.replace = replace
+        self.rows = sum(len(batch) for batch in batches)
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class WriteQueue:
+    """SQLite'a yazan tek görev.
+
+    Aynı anda gelen yüklemeler kuyrukta birikir ve tek işlemde (en fazla WRITE_GROUP_MAX_ROWS satır)
+    yazılıp birlikte yeniden hesaplanır; böylece yazma kilidi için yarışmazlar. Kuyruk dolunca
+    submit bekler (geri basınç).
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        # Beklenmeden kuyruğa verilen yenilemeler; görev referansı tutulmazsa çöp toplanabilir
+        self._background: Set[asyncio.Task] = set()
+
+    def _ensure_started(self):
+        # Kuyruk ve görev olay döngüsüne bağlıdır; döngü değişirse (ör. testlerde) yeniden kurulur
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=settings.WRITE_QUEUE_SIZE)
+        self._lock = asyncio.Lock()
+        # Boş bağlam: yazıcının aşama süreleri onu başlatan isteğin Server-Timing tablosuna yazılmaz
+        self._task = loop.create_task(self._run(), context=contextvars.Context())
+
+    async def submit(
+        self,
+        batches: List[PayrollBatch],
+        refresh: Optional[Iterable[date]] = None,
+        replace: Optional[Dict[date, Set[str]]] = None
+    ):
+        """Partiler kaydedilip anomalileri yeniden hesaplanana kadar bekler; yazma hatası burada yükselir.
+
+        refresh: anomalileri yeniden hesaplanacak dönemler (varsayılan: partilerin dönemleri). Büyük bir dosyanın
+        ara partileri boş küme verir; dönem yalnızca son partiyle bir kez yenilenir.
+        replace: bkz. WriteRequest; ara partiler boş sözlük, son parti dosyanın tüm isimlerini verir.
+        """
+        await (await self.enqueue(batches, refresh, replace))
+
+    async def enqueue(
+        self,
+        batches: List[PayrollBatch],
+        refresh: Optional[Iterable[date]] = None,
+        replace: Optional[Dict[date, Set[str]]] = None
+    ) -> asyncio.Future:
+        """submit'in ilk yarısı: istek kuyruğa girince sonucunu bekleyen future döner.
+
+        Kuyruğa giren istek, bekleyen görev iptal edilse de yazılır; çağıran ne kadarının yazılacağını buradan bilir.
+        """
+        self._ensure_started()
+        request = WriteRequest(batches, refresh, replace)
+        await self._queue.put(request)
+        metrics.inc("write_requests_total")
+        return request.future
+
+    def refresh_later(self, periods: Iterable[date]):
+        """Yarıda kalan yükleme: önceden yazılmış partilerin dönemleri beklenmeden yenilenmek üzere kuyruğa verilir"""
+        self._ensure_started()
+        task = self._loop.create_task(self.submit([], periods), context=contextvars.Context())
+        self._background.add(task)
+        task.add_done_callback(self._forget)
+
+    def _forget(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # Bekleyen istemci yok; hata /metrics üzerinden görünür
+            metrics.inc("refresh_failures_total")
+
+    def exclusive(self) -> asyncio.Lock:
+        """Kuyruk dışı yazmalar (ör. tüm verileri silme) yazıcıyla aynı anda çalışmasın diye"""
+        self._ensure_started()
+        return self._lock
+
+    async def stop(self):
+        """Kuyruktaki yazmalar bitirilir, ardından görev durdurulur"""
+        if self._task is None:
+            return
+        if self._loop is asyncio.get_running_loop() and not self._task.done():
+            await self._queue.join()
+        self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        while True:
+            group = [await self._queue.get()]
+            rows = group[0].rows
+            # Beklemeden alınabilen yüklemeler aynı işleme eklenir
+            while rows < settings.WRITE_GROUP_MAX_ROWS and not self._queue.empty():
+                request = self._queue.get_nowait()
+                group.append(request)
+                rows += request.rows
+            try:
+                await self._write_group(group)
+            finally:
+                for _ in group:
+                    self._queue.task_done()
+
+    async def _write_group(self, group: List[WriteRequest]):
+        """Grup tek işlemde yazılır; başarısız olursa istekler tek tek, kendi işlemlerinde yeniden denenir"""
+        async with self._lock:
+            try:
+                await self._write(group)
+            except Exception as e:
+                error = e
+                await self._restore_index(group)
+            else:
+                error = None
+        if error is None:
+            for request in group:
+                if not request.future.done():
+                    request.future.set_result(None)
+        elif len(group) > 1:
+            # Hatalı yükleme gruptaki diğerlerini düşürmesin
+            for request in group:
+                await self._write_group([request])
+        elif not group[0].future.done():
+            metrics.inc("write_failures_total")
+            group[0].future.set_exception(error)
+
+    async def _restore_index(self, group: List[WriteRequest]):
+        """Geri alınan işlemin dönemleri geçmiş dizininde veritabanındaki haline döndürülür"""
+        periods = set()
+        for request in group:
+            periods |= request.refresh | set(request.replace)
+        try:
+            async with SessionLocal() as db:
+                await history_index.reload_periods(db, periods)
+        except Exception:
+            # Dönemler yüklenemezse dizin bir sonraki kullanımda baştan yüklenir
+            history_index.clear()
+
+    async def _write(self, group: List[WriteRequest]):
+        periods = set()
+        affected = []
+        async with SessionLocal() as db:
+            with stage("write_group"):
+                # Gelme sırasıyla: aynı (personel, dönem) için son yükleme geçerlidir
+                for request in group:
+                    for period, keep in request.replace.items():
+                        # Yeni dosyada olmayan personel dönemden çıkarılır; yenilemede anomalileri de düşer
+                        history_index.discard(await delete_stale_rows(db, period, keep), period)
+                    for batch in request.batches:
+                        await upsert_batch(db, batch)
+                    periods |= request.refresh
+            if periods:
+                # Yenileme aynı oturumda commit edilmemiş kayıtları okur
+                with stage("materialize"):
+                    affected = await AnomalyService.refresh_materialized(db, periods)
+            # Kayıtlar ve anomalileri tek işlemde yazılır; okuyucular hiçbir zaman yalnızca birini görmez
+            with stage("write_commit"):
+                await db.commit()
+        # Toplamları, artışları veya anomali sayıları değişen dönemlerin özetleri yeniden hesaplanır
+        summary_cache.invalidate(affected)
+        metrics.inc("write_groups_total")
+
+write_queue = WriteQueue()